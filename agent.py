@@ -3,7 +3,9 @@ LiveKit Voice Agent for Shopkeepers
 Main entry point for the voice assistant agent
 """
 import asyncio
+import json
 import logging
+import os
 from dotenv import load_dotenv
 
 from livekit import agents
@@ -20,19 +22,20 @@ from livekit.plugins import silero, deepgram, elevenlabs, google, cartesia
 # from livekit.plugins import noise_cancellation
 # from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
-# Import your agent
-from agents.shopkeeper_agent import ShopkeeperAgent
+from tools.logging_pipeline import configure_logging
 
 # Load environment variables
 load_dotenv(".env.local")
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(name)s - %(message)s'
-)
+# Configure logging (queue-based, formatting and I/O on a background thread).
+# Done before importing the agent: the tool modules open storage and log at import time.
+configure_logging(logging.INFO)
 logger = logging.getLogger("shopkeeper-agent")
 
+# Import your agent
+from agents.shopkeeper_agent import ShopkeeperAgent
+from tools.storage import set_tenant
+
 # Reduce noise from other loggers
 logging.getLogger("livekit").setLevel(logging.WARNING)
 logging.getLogger("google_genai").setLevel(logging.WARNING)
@@ -51,6 +54,25 @@ def prewarm(proc: JobProcess):
     logger.info("✅ VAD model loaded")
 
 
+def job_tenant(ctx: JobContext) -> str:
+    """
+    Shop for this job, from the dispatch metadata ({"tenant": "<shop>"}).
+    Falls back to SHOP_TENANT for jobs dispatched without one.
+    """
+    try:
+        metadata = json.loads(ctx.job.metadata or "{}")
+    except ValueError:
+        metadata = {}
+    if isinstance(metadata, dict) and metadata.get("tenant"):
+        return str(metadata["tenant"])
+    return os.getenv("SHOP_TENANT", "default")
+
+
+def session_load(worker) -> float:
+    """Worker load as running jobs / AGENT_MAX_SESSIONS (1.0 = full)."""
+    return len(worker.active_jobs) / int(os.getenv("AGENT_MAX_SESSIONS"))
+
+
 async def entrypoint(ctx: JobContext):
     """
     Main entry point when a user connects to the agent
@@ -58,9 +80,14 @@ async def entrypoint(ctx: JobContext):
     """
     logger.info(f"🎤 New session started in room: {ctx.room.name}")
     
+    # Each job has its own process, so the storage backend serves one shop
+    tenant = job_tenant(ctx)
+    set_tenant(tenant)
+    
     # Set log context
     ctx.log_context_fields = {
         "room": ctx.room.name,
+        "tenant": tenant,
     }
     
     try:
@@ -142,9 +169,28 @@ if __name__ == "__main__":
     logger.info("Features: Inventory, Reminders, Billing")
     logger.info("="*50)
     
+    # Worker capacity, sized with benchmarks/load_simulator.py: the worker
+    # reports itself full once it runs AGENT_MAX_SESSIONS jobs
+    capacity = {}
+    if os.getenv("AGENT_MAX_SESSIONS"):
+        capacity["load_fnc"] = session_load
+        capacity["load_threshold"] = 1.0
+    if os.getenv("AGENT_NUM_IDLE_PROCESSES"):
+        capacity["num_idle_processes"] = int(os.getenv("AGENT_NUM_IDLE_PROCESSES"))
+    if capacity:
+        logger.info(f"Worker capacity: max sessions {os.getenv('AGENT_MAX_SESSIONS')}, "
+                    f"idle processes {os.getenv('AGENT_NUM_IDLE_PROCESSES')}")
+    
+    # Explicit dispatch (job metadata carries the shop tenant) needs an agent name
+    dispatch = {}
+    if os.getenv("AGENT_NAME"):
+        dispatch["agent_name"] = os.getenv("AGENT_NAME")
+    
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
             prewarm_fnc=prewarm,
+            **capacity,
+            **dispatch,
         )
     )
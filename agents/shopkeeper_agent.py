@@ -13,6 +13,8 @@ from pydantic import Field
 # Import tools from shopkeeper-assistant/tools directory
 from tools.inventory_tool import process_inventory as inventory_process
 from tools.reminder_tool import process_reminders as reminder_process
+from tools.analytics_tool import PERIODS, bill_total, record_bill, sales_report as analytics_report
+from tools.storage import get_storage
 
 
 class ShopkeeperAgent(Agent):
@@ -42,11 +44,14 @@ When the user talks about:
 - Stock, items, quantity, inventory → use process_inventory tool
 - Reminders, notes, tasks, yaad → use process_reminders tool
 - Bills, payments, transactions → use create_bill tool
+- Sales history, what sold most, how much sold (bika, bikta) → use sales_report tool
 
 Examples:
 - "5kg aloo add karo" → process_inventory
 - "Kal subah reminder set karo" → process_reminders  
 - "Customer ka bill banao" → create_bill
+- "Is hafte kitna aloo bika?" → sales_report
+- "Sabse zyada kya bikta hai?" → sales_report
 """
         )
     
@@ -140,13 +145,45 @@ Examples:
             bill_text += f"Items: {items}\n"
             bill_text += "="*40 + "\n"
             
-            # You can add more sophisticated billing logic here
-            # For now, just return the basic bill
+            # Persist the bill and feed the sales rollups. A total is only stored
+            # and read out when every line was understood and priced.
+            total = bill_total(items)
+            get_storage().add_bill(customer_name, items, total)
+            record_bill(items)
             
+            if total is not None:
+                return f"Bill created for {customer_name}. Total is {total:g} rupees."
             return f"Bill created for {customer_name}. Please check the details."
         except Exception as e:
             return f"Sorry, could not create bill: {str(e)}"
     
+    @function_tool
+    async def sales_report(
+        self,
+        context: RunContext,
+        period: Annotated[str, Field(description=f"Time period, one of: {', '.join(PERIODS)}")] = "week",
+        item: Annotated[str, Field(description="Item name in Hindi or English, e.g. 'aloo' or 'potato'. Empty for top sellers")] = "",
+    ) -> str:
+        """
+        Answer sales and stock-movement questions from precomputed rollups.
+        
+        Args:
+            period: today, yesterday, week, last_week, last_7_days or month
+            item: Item to report on, or empty to list the top selling items
+        
+        Examples:
+        - "Is hafte kitna aloo bika?" → period="week", item="aloo"
+        - "Sabse zyada kya bikta hai?" → period="week", item=""
+        - "Aaj kitna doodh gaya?" → period="today", item="doodh"
+        
+        Returns:
+            Quantities sold, stock movement and revenue for the period
+        """
+        try:
+            return analytics_report(item=item, period=period)
+        except Exception as e:
+            return f"Sorry, could not get the sales report: {str(e)}"
+    
     async def on_enter(self):
         """
         Called when the agent session starts
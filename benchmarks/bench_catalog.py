@@ -0,0 +1,41 @@
+"""
+Item/unit resolution timings for tools/catalog.py.
+
+Usage:
+    python benchmarks/bench_catalog.py --iterations 20000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.catalog import canonicalize_kb, normalize_quantity, parse_quantities, resolve_item  # noqa: E402
+
+SEED_KB = Path(__file__).resolve().parent.parent / "storage" / "inventory_kb.txt"
+
+
+def timeit(label: str, fn, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<48} {per_call:8.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    kb = SEED_KB.read_text()
+    timeit('resolve_item("pyaaz")', lambda: resolve_item("pyaaz"), args.iterations)
+    timeit('normalize_quantity(500, "gm", "jeera")', lambda: normalize_quantity(500, "gm", "jeera"), args.iterations)
+    timeit('parse_quantities("5kg aloo aur 2 packet maida ...")',
+           lambda: parse_quantities("5kg aloo aur 2 packet maida add karo"), args.iterations)
+    timeit(f"canonicalize_kb({SEED_KB.name})", lambda: canonicalize_kb(kb), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
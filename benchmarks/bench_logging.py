@@ -0,0 +1,98 @@
+"""
+Per-turn logging overhead, before and after the queue-based pipeline.
+
+A "turn" logs what call_llm logs: the full prompt (instructions + KB + user
+prompt) and the LLM response (the updated KB as JSON). Each mode runs in its
+own process and writes to a real log file:
+
+- before: logging.basicConfig + logger.info of the full prompt and response
+- after:  configure_logging() + log_payload(), default sampling and size cap
+- after-unsampled: the same pipeline with every payload logged (sample rate 1)
+
+Only time spent in the calling (voice turn) thread is measured.
+
+Usage:
+    python benchmarks/bench_logging.py --kb-items 2000 --turns 500
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def build_turn(kb_items: int):
+    kb = "Last Updated: 2025-10-29 01:55:06\nItems:\n" + "\n".join(
+        f"- {i % 50 + 1} kg item{i} (price: {i % 90 + 10} rupees/kg, supplier: Ram 98765{i % 100000:05d})"
+        for i in range(kb_items)
+    )
+    prompt = f"System:\nYou update a plain-text inventory note...\n\nCurrent inventory note (KB):\n{kb}\n\nUser prompt:\n5kg aloo add karo\n"
+    response = json.dumps({"kb": kb, "response": "5 kilo aloo add kar diya", "needs_confirmation": False})
+    return prompt, response
+
+
+def run_mode(mode: str, kb_items: int, turns: int, log_path: str, out: mp.Queue):
+    prompt, response = build_turn(kb_items)
+    logger = logging.getLogger("tools.inventory_tool")
+
+    if mode == "before":
+        logging.basicConfig(filename=log_path, format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+
+        def log_turn():
+            logger.info("LLM prompt: %s", prompt)
+            logger.info("LLM response: %s", response)
+    else:
+        if mode == "after-unsampled":
+            os.environ["LOG_PAYLOAD_SAMPLE_RATE"] = "1"
+        from tools.logging_pipeline import configure_logging, log_payload, sample_payloads, shutdown_logging
+        configure_logging(logging.INFO, stream=open(log_path, "a"))
+
+        def log_turn():
+            sampled = sample_payloads()
+            log_payload(logger, "LLM prompt", prompt, sampled=sampled)
+            log_payload(logger, "LLM response", response, sampled=sampled)
+
+    timings = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        log_turn()
+        timings.append(time.perf_counter() - start)
+
+    if mode != "before":
+        shutdown_logging()
+    out.put((timings, os.path.getsize(log_path)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb-items", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=500)
+    args = parser.parse_args()
+
+    prompt, response = build_turn(args.kb_items)
+    print(f"KB items: {args.kb_items} | prompt {len(prompt) / 1024:.0f} KB, response {len(response) / 1024:.0f} KB per turn")
+    ctx = mp.get_context("spawn")
+    for mode in ("before", "after", "after-unsampled"):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = ctx.Queue()
+            proc = ctx.Process(target=run_mode, args=(mode, args.kb_items, args.turns, f"{tmp}/agent.log", out))
+            proc.start()
+            timings, log_bytes = out.get()
+            proc.join()
+        timings = sorted(t * 1e6 for t in timings)
+        print(
+            f"{mode:>16} | per turn p50={statistics.median(timings):8.1f}us "
+            f"p99={timings[int(len(timings) * 0.99)]:8.1f}us max={timings[-1]:8.1f}us | "
+            f"log written {log_bytes / 1024 / 1024:7.2f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Concurrent-writer benchmark for the storage backends.
+
+Spawns N processes (like LiveKit job processes on one worker). Each one runs
+K iterations of: increment a shared "- N pc counter" line in the inventory KB
+(with a backup), add a bill. The increment is done two ways:
+
+- blind:  read_inventory_kb() then write_inventory_kb(), what the inventory
+          tool used to do; concurrent increments overwrite each other
+- atomic: update_inventory_kb(), read and write under one lock/transaction
+
+Reports per-operation latency percentiles, total throughput, how many KB
+increments and bills survived (lost writes show up as a count below N*K).
+
+Usage:
+    python benchmarks/bench_storage.py --processes 8 --iterations 200
+    python benchmarks/bench_storage.py --backend sqlite --mode atomic --processes 16
+"""
+import argparse
+import multiprocessing as mp
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.storage import SQLiteStorage, TextFileStorage, parse_inventory_kb, render_inventory_kb  # noqa: E402
+
+SEED_DIR = Path(__file__).resolve().parent.parent / "storage"
+
+
+def make_backend(backend: str, workdir: Path):
+    text = TextFileStorage(workdir)
+    if backend == "text":
+        return text
+    return SQLiteStorage(workdir / "shop.db", import_from=text)
+
+
+def read_counter(kb_text: str) -> int:
+    _, rows = parse_inventory_kb(kb_text)
+    return next((int(qty) for item, qty, _, _, _ in rows if item == "counter"), 0)
+
+
+def increment_counter(kb_text: str) -> str:
+    """Same KB with the counter line bumped by one (constant size, so timings don't drift)."""
+    label, rows = parse_inventory_kb(kb_text)
+    count = read_counter(kb_text) + 1
+    lines = [line for item, _, _, _, line in rows if item != "counter"]
+    return render_inventory_kb(label, [*lines, f"- {count} pc counter"])
+
+
+def writer(backend: str, mode: str, workdir: Path, worker_id: int, iterations: int, out: mp.Queue):
+    storage = make_backend(backend, workdir)
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        if mode == "blind":
+            storage.write_inventory_kb(increment_counter(storage.read_inventory_kb()), backup=True)
+        else:
+            storage.update_inventory_kb(increment_counter, backup=True)
+        storage.add_bill(f"customer{worker_id}", f"{i}kg aloo at 30 rupees", 30.0 * i)
+        latencies.append(time.perf_counter() - start)
+    out.put(latencies)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(backend: str, mode: str, processes: int, iterations: int):
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench-{backend}-"))
+    try:
+        for name in ("inventory_kb.txt", "reminders_kb.txt"):
+            shutil.copy(SEED_DIR / name, workdir / name)
+        # Create the schema / import once so the workers measure steady state
+        make_backend(backend, workdir).read_inventory_kb()
+
+        out = mp.Queue()
+        procs = [
+            mp.Process(target=writer, args=(backend, mode, workdir, n, iterations, out))
+            for n in range(processes)
+        ]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        latencies = []
+        for _ in procs:
+            latencies.extend(out.get())
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        storage = make_backend(backend, workdir)
+        bills = len(storage.list_bills())
+        increments = read_counter(storage.read_inventory_kb())
+        expected = processes * iterations
+        print(
+            f"{backend:>6} {mode:>6} | procs={processes:<3} iters={iterations:<5} | "
+            f"{expected / elapsed:8.0f} ops/s | "
+            f"p50={statistics.median(latencies) * 1e3:6.2f}ms "
+            f"p95={percentile(latencies, 95) * 1e3:6.2f}ms "
+            f"p99={percentile(latencies, 99) * 1e3:6.2f}ms | "
+            f"increments {increments}/{expected} bills {bills}/{expected}"
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["text", "sqlite", "all"], default="all")
+    parser.add_argument("--mode", choices=["blind", "atomic", "all"], default="all")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    backends = ["text", "sqlite"] if args.backend == "all" else [args.backend]
+    modes = ["blind", "atomic"] if args.mode == "all" else [args.mode]
+    for backend in backends:
+        for mode in modes:
+            run(backend, mode, args.processes, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Multi-session load simulator for the full agent pipeline.
+
+Runs N concurrent simulated sessions through ShopkeeperAgent, one process
+per session like LiveKit's job processes. Each session replaces the external
+services with fakes that follow realistic latency distributions:
+
+- FakeSTT: final-transcript delay after end of speech, plus per-frame CPU
+  while audio streams in (VAD / resampling)
+- FakeLLM: time-to-first-token for the agent LLM, and the tool-level Gemini
+  call inside tools/*_tool.py (patched call_llm, blocking like the real one)
+- FakeTTS: time-to-first-audio, plus per-frame CPU while audio plays out
+
+Everything else is the real code: the agent's function tools, the tool
+modules, storage and analytics.
+
+What it does NOT measure: the fakes are not livekit stt/llm/tts plugins and
+no AgentSession runs, so the SDK's own per-session cost (VAD, audio
+resampling, the room connection) is missing and the CPU figures are the
+synthetic --frame-cpu-ms load. Treat the result as an upper bound on
+sessions per worker and confirm it with a real session before relying on it.
+
+It ramps 1, 2, 4, ... sessions until the SLO (turn latency from end of user
+speech to first agent audio, event-loop lag) breaks, then bisects between the
+last passing and the first failing step. The passing session count is then
+capped by what --node-cpus and --node-mem-mb can hold at the measured CPU and
+RSS per session, since the node the worker runs on may be smaller than the
+machine running the benchmark. The result is a session count for
+AGENT_MAX_SESSIONS, which agent.py turns into a job-count load_fnc
+(active jobs / max sessions, load_threshold 1.0) - not a CPU threshold,
+since the simulated CPU load says little about the real one.
+
+Usage:
+    python benchmarks/load_simulator.py --max-sessions 32 --turns 10
+    python benchmarks/load_simulator.py --slo-p95-ms 2500 --node-cpus 4 --node-mem-mb 8192
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from queue import Empty
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Scripted shopkeeper turns: (utterance, tool the agent LLM picks, tool kwargs)
+SCRIPT = [
+    ("Namaste", None, {}),
+    ("5kg aloo add karo", "process_inventory", {"user_prompt": "5kg aloo add karo"}),
+    ("Kitna pyaaz hai stock mein?", "process_inventory", {"user_prompt": "Kitna pyaaz hai stock mein?"}),
+    ("Kal subah 9 baje reminder set karo", "process_reminders",
+     {"user_prompt": "Kal subah 9 baje reminder set karo"}),
+    ("Ramesh ka bill banao, 5kg aloo at 60 rupees", "create_bill",
+     {"customer_name": "Ramesh", "items": "5kg aloo at 60 rupees"}),
+    ("Is hafte kitna aloo bika?", "sales_report", {"period": "week", "item": "potato"}),
+]
+
+KB_IN_PROMPT_RE = re.compile(
+    r"(?:Current inventory note \(KB\)|Current reminders KB):\n(?P<kb>.*?)\n\nUser prompt:", re.DOTALL
+)
+
+FRAME_S = 0.02  # 20 ms audio frames
+
+
+class LatencyModel:
+    """Log-normal latency given its median and p95, in milliseconds."""
+
+    def __init__(self, median_ms: float, p95_ms: float):
+        self.median = median_ms / 1000
+        self.sigma = math.log(max(p95_ms, median_ms) / median_ms) / 1.645
+
+    def sample(self, rng: random.Random) -> float:
+        return self.median * math.exp(self.sigma * rng.gauss(0, 1))
+
+
+def burn_cpu(seconds: float):
+    """Busy-wait to stand in for CPU work (audio processing) in a fake component."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class FakeSTT:
+    def __init__(self, args, rng: random.Random):
+        self.latency = LatencyModel(args.stt_median_ms, args.stt_p95_ms)
+        self.frame_cpu = args.frame_cpu_ms / 1000
+        self.rng = rng
+
+    async def listen(self, speech_s: float):
+        """Stream the user's speech in 20 ms frames, then wait for the final transcript."""
+        for _ in range(int(speech_s / FRAME_S)):
+            burn_cpu(self.frame_cpu)
+            await asyncio.sleep(FRAME_S)
+
+    async def final_transcript(self):
+        await asyncio.sleep(self.latency.sample(self.rng))
+
+
+class FakeLLM:
+    def __init__(self, args, rng: random.Random):
+        self.ttft = LatencyModel(args.llm_median_ms, args.llm_p95_ms)
+        self.tool_latency = LatencyModel(args.tool_llm_median_ms, args.tool_llm_p95_ms)
+        self.rng = rng
+
+    async def first_token(self):
+        await asyncio.sleep(self.ttft.sample(self.rng))
+
+    def tool_call_llm(self, prompt: str) -> str:
+        """Drop-in for tools.*.call_llm: blocks like the real Gemini call and echoes the KB."""
+        time.sleep(self.tool_latency.sample(self.rng))
+        match = KB_IN_PROMPT_RE.search(prompt)
+        return json.dumps({
+            "kb": match.group("kb") if match else "",
+            "response": "Theek hai, ho gaya.",
+            "needs_confirmation": False,
+        })
+
+
+class FakeTTS:
+    def __init__(self, args, rng: random.Random):
+        self.latency = LatencyModel(args.tts_median_ms, args.tts_p95_ms)
+        self.frame_cpu = args.frame_cpu_ms / 1000
+        self.rng = rng
+
+    async def first_audio(self):
+        await asyncio.sleep(self.latency.sample(self.rng))
+
+    async def play(self, audio_s: float):
+        for _ in range(int(audio_s / FRAME_S)):
+            burn_cpu(self.frame_cpu)
+            await asyncio.sleep(FRAME_S)
+
+
+def read_rss_mb(field: str = "VmRSS") -> float:
+    """Current (VmRSS) or peak (VmHWM) resident memory of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def monitor_loop_lag(samples: list, interval: float, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+
+async def run_session(agent, args, rng: random.Random, stt: FakeSTT, llm: FakeLLM, tts: FakeTTS):
+    latencies = []
+    for turn in range(args.turns):
+        utterance, tool, kwargs = SCRIPT[turn % len(SCRIPT)]
+        await stt.listen(speech_s=0.06 * len(utterance.split()) + 0.5)
+
+        # Turn latency: end of user speech -> first agent audio
+        start = time.perf_counter()
+        await stt.final_transcript()
+        await llm.first_token()
+        if tool is not None:
+            await getattr(agent, tool)(None, **kwargs)
+            await llm.first_token()
+        await tts.first_audio()
+        latencies.append(time.perf_counter() - start)
+
+        await tts.play(audio_s=rng.uniform(1.5, 4.0))
+        await asyncio.sleep(rng.uniform(0.5, args.think_time_s))
+    return latencies
+
+
+def session_process(session_id: int, args, workdir: str, ready: mp.Queue, start, results: mp.Queue):
+    """One LiveKit-style job process running a single simulated session."""
+    os.chdir(workdir)
+    os.environ.setdefault("GOOGLE_API_KEY", "simulated")
+    os.environ.setdefault("LANGCHAIN_API_KEY", "simulated")
+    os.environ["STORAGE_BACKEND"] = args.storage_backend
+    sys.path.insert(0, str(ROOT))
+
+    import tools.inventory_tool as inventory_tool
+    import tools.reminder_tool as reminder_tool
+    from agents.shopkeeper_agent import ShopkeeperAgent
+
+    rng = random.Random(args.seed * 1000 + session_id)
+    stt, llm, tts = FakeSTT(args, rng), FakeLLM(args, rng), FakeTTS(args, rng)
+    inventory_tool.call_llm = llm.tool_call_llm
+    reminder_tool.call_llm = llm.tool_call_llm
+    agent = ShopkeeperAgent()
+
+    ready.put(read_rss_mb())
+    start.wait()
+
+    async def main():
+        lag = []
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(monitor_loop_lag(lag, args.lag_interval_ms / 1000, stop))
+        await asyncio.sleep(rng.uniform(0, 1.0))  # stagger session starts
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        latencies = await run_session(agent, args, rng, stt, llm, tts)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+        stop.set()
+        await monitor
+        return latencies, lag, cpu, wall
+
+    latencies, lag, cpu, wall = asyncio.run(main())
+    results.put({
+        "latencies": latencies,
+        "lag": lag,
+        "cpu_cores": cpu / wall,
+        "rss_mb": read_rss_mb(),
+        "rss_peak_mb": read_rss_mb("VmHWM"),
+    })
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def collect(queue, procs):
+    """One message per process, failing fast if a session process dies."""
+    messages = []
+    while len(messages) < len(procs):
+        try:
+            messages.append(queue.get(timeout=1.0))
+        except Empty:
+            crashed = [p for p in procs if p.exitcode not in (None, 0)]
+            if crashed:
+                for p in procs:
+                    p.kill()
+                raise RuntimeError(f"{len(crashed)} session process(es) crashed, see traceback above")
+    return messages
+
+
+def run_step(sessions: int, args):
+    workdir = tempfile.mkdtemp(prefix="loadsim-")
+    try:
+        shutil.copytree(ROOT / "storage", Path(workdir) / "storage")
+        ctx = mp.get_context("spawn")
+        ready, results, start = ctx.Queue(), ctx.Queue(), ctx.Event()
+        procs = [
+            ctx.Process(target=session_process, args=(n, args, workdir, ready, start, results))
+            for n in range(sessions)
+        ]
+        for p in procs:
+            p.start()
+        idle_rss = collect(ready, procs)
+        start.set()
+        per_session = collect(results, procs)
+        for p in procs:
+            p.join()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = [x * 1000 for s in per_session for x in s["latencies"]]
+    lag = [x * 1000 for s in per_session for x in s["lag"]]
+    step = {
+        "sessions": sessions,
+        "turn_p50_ms": percentile(latencies, 50),
+        "turn_p95_ms": percentile(latencies, 95),
+        "turn_p99_ms": percentile(latencies, 99),
+        "lag_p99_ms": percentile(lag, 99),
+        "lag_max_ms": max(lag),
+        "cpu_cores_per_session": statistics.mean(s["cpu_cores"] for s in per_session),
+        "rss_mb_per_session": statistics.mean(s["rss_peak_mb"] for s in per_session),
+        "idle_rss_mb": statistics.mean(idle_rss),
+    }
+    step["slo_ok"] = step["turn_p95_ms"] <= args.slo_p95_ms and step["lag_p99_ms"] <= args.slo_lag_ms
+    return step
+
+
+def node_memory_mb() -> float:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 4096.0
+
+
+def recommend(steps, args):
+    """Turn the ramp results into a worker capacity (AGENT_MAX_SESSIONS) for this node."""
+    passing = [s for s in steps if s["slo_ok"]]
+    if not passing:
+        return None
+    best = max(passing, key=lambda s: s["sessions"])
+    mem_budget = args.node_mem_mb * args.mem_headroom
+    mem_sessions = int(mem_budget // best["rss_mb_per_session"])
+    cpu_budget = args.node_cpus * args.cpu_headroom
+    cpu_per_session = best["cpu_cores_per_session"]
+    cpu_sessions = int(cpu_budget // cpu_per_session) if cpu_per_session > 0 else best["sessions"]
+    capacity = max(1, min(best["sessions"], mem_sessions, cpu_sessions))
+
+    # Keep roughly a quarter of capacity pre-warmed, within the memory left over
+    spare_mb = mem_budget - capacity * best["rss_mb_per_session"]
+    idle = max(1, math.ceil(capacity * 0.25))
+    idle = max(1, min(idle, int(spare_mb // best["idle_rss_mb"]) if best["idle_rss_mb"] else idle))
+    return {
+        "max_sessions": capacity,
+        "slo_limited_sessions": best["sessions"],
+        "memory_limited_sessions": mem_sessions,
+        "cpu_limited_sessions": cpu_sessions,
+        "slo_broken_at": min((s["sessions"] for s in steps if not s["slo_ok"]), default=None),
+        "num_idle_processes": idle,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-sessions", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=len(SCRIPT) * 2, help="Turns per session")
+    parser.add_argument("--think-time-s", type=float, default=3.0, help="Max pause before the next user turn")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--storage-backend", choices=["text", "sqlite"], default="sqlite")
+    # SLO
+    parser.add_argument("--slo-p95-ms", type=float, default=3000,
+                        help="p95 end-of-speech -> first audio (tool turns include two LLM round trips)")
+    parser.add_argument("--slo-lag-ms", type=float, default=100, help="p99 event-loop lag")
+    parser.add_argument("--lag-interval-ms", type=float, default=50)
+    # Latency distributions of the fake components
+    parser.add_argument("--stt-median-ms", type=float, default=250)
+    parser.add_argument("--stt-p95-ms", type=float, default=600)
+    parser.add_argument("--llm-median-ms", type=float, default=450)
+    parser.add_argument("--llm-p95-ms", type=float, default=1100)
+    parser.add_argument("--tool-llm-median-ms", type=float, default=700)
+    parser.add_argument("--tool-llm-p95-ms", type=float, default=1800)
+    parser.add_argument("--tts-median-ms", type=float, default=180)
+    parser.add_argument("--tts-p95-ms", type=float, default=450)
+    parser.add_argument("--frame-cpu-ms", type=float, default=0.4, help="CPU per 20 ms audio frame (VAD, resampling)")
+    # Node
+    parser.add_argument("--node-cpus", type=float, default=os.cpu_count() or 1,
+                        help="CPUs of the node the worker will run on")
+    parser.add_argument("--node-mem-mb", type=float, default=node_memory_mb())
+    parser.add_argument("--mem-headroom", type=float, default=0.8, help="Fraction of node memory sessions may use")
+    parser.add_argument("--cpu-headroom", type=float, default=0.8, help="Fraction of node CPUs sessions may use")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"Node: {args.node_cpus:g} CPUs, {args.node_mem_mb:.0f} MB | "
+          f"SLO: turn p95 <= {args.slo_p95_ms:g} ms, loop lag p99 <= {args.slo_lag_ms:g} ms")
+    print(f"{'sessions':>8} | {'p50':>7} {'p95':>7} {'p99':>7} ms | {'lag p99':>8} {'max':>7} ms | "
+          f"{'cpu/sess':>8} | {'rss/sess':>8} | SLO")
+
+    steps = []
+
+    def measure(sessions: int) -> bool:
+        step = run_step(sessions, args)
+        steps.append(step)
+        print(f"{step['sessions']:>8} | {step['turn_p50_ms']:7.0f} {step['turn_p95_ms']:7.0f} "
+              f"{step['turn_p99_ms']:7.0f}    | {step['lag_p99_ms']:8.1f} {step['lag_max_ms']:7.1f}    | "
+              f"{step['cpu_cores_per_session']:8.3f} | {step['rss_mb_per_session']:6.0f}MB | "
+              f"{'ok' if step['slo_ok'] else 'BROKEN'}")
+        return step["slo_ok"]
+
+    # Ramp in powers of two until the SLO breaks ...
+    passed, failed = 0, None
+    sessions = 1
+    while sessions <= args.max_sessions:
+        if not measure(sessions):
+            failed = sessions
+            break
+        passed = sessions
+        sessions *= 2
+    # ... then bisect between the last passing and the first failing step
+    if passed and failed:
+        while failed - passed > 1:
+            mid = (passed + failed) // 2
+            if measure(mid):
+                passed = mid
+            else:
+                failed = mid
+
+    rec = recommend(steps, args)
+    print()
+    if rec is None:
+        print("SLO broken with a single session - fix per-turn latency before sizing the worker.")
+    else:
+        if rec["slo_broken_at"] is None:
+            print(f"SLO held up to {steps[-1]['sessions']} sessions (raise --max-sessions to find the limit).")
+        else:
+            print(f"SLO broke at {rec['slo_broken_at']} sessions.")
+        print(f"Recommended capacity: {rec['max_sessions']} sessions per worker "
+              f"(SLO limit {rec['slo_limited_sessions']}, memory limit {rec['memory_limited_sessions']}, "
+              f"CPU limit {rec['cpu_limited_sessions']})")
+        print("Simulated STT/LLM/TTS, no AgentSession: SDK per-session cost is not included and the")
+        print("CPU figures are synthetic. Confirm with a real session before relying on this number.")
+        print("Set in .env.local (read by agent.py, load = active jobs / AGENT_MAX_SESSIONS):")
+        print(f"    AGENT_MAX_SESSIONS={rec['max_sessions']}")
+        print(f"    AGENT_NUM_IDLE_PROCESSES={rec['num_idle_processes']}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"steps": steps, "recommendation": rec}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Bill parsing for sales analytics."""
+from datetime import datetime
+
+from tools.analytics_tool import bill_total, inventory_movements, parse_bill_items, split_bill_items
+from tools.storage import Movement
+
+OLD_KB = "Last Updated: N/A\nItems:\n- 18 kg potato\n- 6 kg onion"
+NEW_KB = "Last Updated: N/A\nItems:\n- 15 kg potato\n- 6 kg onion"
+TS = datetime(2025, 10, 29, 10, 0)
+
+
+def test_parse_bill_items_line_amount_and_unit_price():
+    assert parse_bill_items("5kg aloo at 60 rupees, 2kg pyaaz at 20 per kg") == [
+        ("potato", 5.0, "kg", 60.0),
+        ("onion", 2.0, "kg", 40.0),
+    ]
+
+
+def test_parse_bill_items_converts_to_price_unit():
+    assert parse_bill_items("500 gm jeera at 400 per kg") == [("cumin", 0.5, "kg", 200.0)]
+
+
+def test_parse_bill_items_multi_word_item_without_unit():
+    assert parse_bill_items("3 toor dal at 100") == [("toor dal", 3.0, "", 100.0)]
+
+
+def test_parse_bill_items_bare_count():
+    assert parse_bill_items("6 kele at 30") == [("banana", 0.5, "dozen", 30.0)]
+    assert parse_bill_items("6 kele at 40 per dozen") == [("banana", 0.5, "dozen", 20.0)]
+
+
+def test_bill_total():
+    assert bill_total("5kg aloo at 60 rupees, 2kg pyaaz at 20 per kg") == 100.0
+
+
+def test_bill_total_needs_every_line_priced():
+    assert bill_total("5kg aloo at 60 rupees, 2kg pyaaz") is None
+
+
+def test_bill_total_needs_every_line_parsed():
+    assert split_bill_items("5kg aloo at 60 rupees, pyaaz 2 kg at 40")[1] == ["pyaaz 2 kg at 40"]
+    assert bill_total("5kg aloo at 60 rupees, pyaaz 2 kg at 40") is None
+
+
+def test_inventory_movements_stock_out():
+    assert inventory_movements(OLD_KB, NEW_KB, TS) == [Movement(TS, "potato", "kg", qty_out=3.0)]
+
+
+def test_inventory_movements_sold():
+    assert inventory_movements(OLD_KB, NEW_KB, TS, sold=True) == [Movement(TS, "potato", "kg", qty_sold=3.0)]
@@ -0,0 +1,64 @@
+"""Item/unit resolution and KB canonicalization."""
+from tools.catalog import canonicalize_kb, merge_details, normalize_quantity, resolve_item, unit_conflicts
+from tools.inventory_commands import apply_fast_path
+
+
+def kb(*lines):
+    return "\n".join(["Last Updated: 2025-10-29 01:55:06", "Items:", *lines])
+
+
+def test_resolve_aliases():
+    assert resolve_item("pyaaz").name == "onion"
+    assert resolve_item("Phool Gobhi").name == "cauliflower"
+
+
+def test_normalize_quantity():
+    assert normalize_quantity(500, "gm", "jeera") == (0.5, "kg")
+    assert normalize_quantity(6, None, "kele") == (0.5, "dozen")
+    assert normalize_quantity(2, None, "aloo") == (2, "")  # 2 what? left to the shopkeeper
+
+
+def test_canonicalize_merges_duplicates():
+    assert canonicalize_kb(kb("- 5 kg potato", "- 3 kilo aloo")) == kb("- 8 kg potato")
+
+
+def test_canonicalize_keeps_details_of_both_lines():
+    merged = canonicalize_kb(kb("- 5 kg potato (price: 12)", "- 3 kg aloo (supplier: Ram)"))
+    assert merged == kb("- 8 kg potato (price: 12, supplier: Ram)")
+
+
+def test_canonicalize_keeps_conflicting_details_apart():
+    text = canonicalize_kb(kb("- 5 kg potato (price: 12)", "- 3 kg aloo (price: 15)"))
+    assert text == kb("- 5 kg potato (price: 12)", "- 3 kg potato (price: 15)")
+    # two potato lines: the fast path leaves it to the LLM
+    assert apply_fast_path("2 kg aloo add karo", text) is None
+
+
+def test_merge_details():
+    assert merge_details("price: 12", None) == "price: 12"
+    assert merge_details("price: 12", "price: 12, supplier: Ram") == "price: 12, supplier: Ram"
+    assert merge_details("price: 12", "price: 15") is None
+
+
+def test_stt_variant_bobi():
+    assert canonicalize_kb(kb("- 7 kilo bobi", "- 7 kilo cauliflower")) == kb("- 14 kg cauliflower")
+
+
+def test_unit_conflicts():
+    text = canonicalize_kb(kb("- 7 KG milk", "- 2 litre doodh", "- 18 kg potato"))
+    assert text == kb("- 7 kg milk", "- 2 litre milk", "- 18 kg potato")
+    assert unit_conflicts(text) == [("milk", "kg", "litre")]
+
+
+def test_unit_conflicts_without_unit():
+    text = canonicalize_kb(kb("- 12 kela", "- 5 aloo"))
+    assert text == kb("- 1 dozen banana", "- 5 potato")
+    assert unit_conflicts(text) == [("potato", "", "kg")]
+
+
+def test_unit_conflicts_go_to_llm():
+    text = kb("- 7 kg milk", "- 18 kg potato")
+    assert apply_fast_path("2 litre doodh add karo", text) is None
+    assert apply_fast_path("kitna doodh bacha hai", text) is None
+    # a quantity in a unit the item isn't sold in, even when the KB is fine
+    assert apply_fast_path("2 kilo doodh add karo", kb("- 7 litre milk")) is None
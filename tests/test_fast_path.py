@@ -0,0 +1,121 @@
+"""Fast-path inventory commands and the quantity parser behind them."""
+import pytest
+
+from tools.catalog import parse_quantities
+from tools.inventory_commands import apply_fast_path, is_sale
+from tools.storage import parse_inventory_kb
+
+KB = """Last Updated: 2025-10-29 01:55:06
+Items:
+- 18 kg potato
+- 6 kg onion
+- 2 packet maida"""
+
+
+def stock(kb_text):
+    _, rows = parse_inventory_kb(kb_text)
+    return {item: (quantity, unit) for item, quantity, unit, _, _ in rows}
+
+
+# -- apply_fast_path ----------------------------------------------------------
+
+def test_add():
+    updated_kb, response = apply_fast_path("5kg aloo add karo", KB)
+    assert stock(updated_kb)["potato"] == (23.0, "kg")
+    assert response == "Added 5 kg potato, now 23 kg."
+
+
+def test_remove_converts_units():
+    updated_kb, response = apply_fast_path("500 gm pyaaz becha", KB)
+    assert stock(updated_kb)["onion"] == (5.5, "kg")
+    assert response == "Removed 0.5 kg onion, 5.5 kg left."
+
+
+def test_pao_is_a_quarter_kilo():
+    updated_kb, _ = apply_fast_path("1 pao aloo add karo", KB)
+    assert stock(updated_kb)["potato"] == (18.25, "kg")
+    assert "bread" not in stock(updated_kb)
+
+
+def test_bare_count_is_pieces():
+    updated_kb, response = apply_fast_path("6 kela liya", KB)
+    assert stock(updated_kb)["banana"] == (0.5, "dozen")
+    assert response == "Added 0.5 dozen banana, now 0.5 dozen."
+
+
+def test_bare_number_by_weight_goes_to_llm():
+    assert apply_fast_path("5 aloo add karo", KB) is None
+
+
+def test_set():
+    updated_kb, _ = apply_fast_path("aloo 10 kilo bacha hai", KB)
+    assert stock(updated_kb)["potato"] == (10.0, "kg")
+
+
+def test_add_new_item():
+    updated_kb, _ = apply_fast_path("2 kilo tamatar liya", KB)
+    assert stock(updated_kb)["tomato"] == (2.0, "kg")
+
+
+def test_query_does_not_change_kb():
+    assert apply_fast_path("kitna aloo bacha hai?", KB) == (None, "Potato: 18 kg in stock.")
+
+
+@pytest.mark.parametrize("prompt", [
+    "5 kg aloo add mat karo",
+    "dont add 5 kg aloo",
+    "don't add 5 kg aloo",
+    "5 kg aloo nahi bika",
+    "5 kg aloo add nahi karna",
+    "do not remove 5 kg aloo",
+])
+def test_negation_goes_to_llm(prompt):
+    assert apply_fast_path(prompt, KB) is None
+
+
+@pytest.mark.parametrize("prompt", [
+    "kya maine 5 kg aloo add kiya tha?",
+    "did I add 5 kg aloo",
+    "5 kg aloo add kiya?",
+])
+def test_question_with_quantity_goes_to_llm(prompt):
+    assert apply_fast_path(prompt, KB) is None
+
+
+@pytest.mark.parametrize("prompt", [
+    "aloo ki price 15 rupay kilo",   # metadata
+    "5 kg aloo aur 2 kg pyaaz add karo, 1 kg becha",  # two intents
+    "5 kg xyzzy add karo",           # unknown item
+    "20 kg aloo becha",              # would go negative
+    "2 kg chawal becha",             # removing an item that isn't stocked
+])
+def test_ambiguous_goes_to_llm(prompt):
+    assert apply_fast_path(prompt, KB) is None
+
+
+# -- parse_quantities ---------------------------------------------------------
+
+def test_is_sale():
+    assert is_sale("2 kilo pyaaz becha")
+    assert not is_sale("2 kilo pyaaz kharab hua, kam karo")
+
+
+def test_parse_quantities():
+    parsed = [(q.item, q.quantity, q.unit) for q in parse_quantities("5kg aloo aur 2 packet maida add karo")]
+    assert parsed == [("potato", 5.0, "kg"), ("maida", 2.0, "packet")]
+
+
+def test_parse_quantities_bare_count():
+    parsed = [(q.item, q.quantity, q.unit) for q in parse_quantities("6 kele aur 5 aloo")]
+    assert parsed == [("banana", 0.5, "dozen"), ("potato", 5.0, "")]
+
+
+def test_parse_quantities_item_before_number():
+    parsed = [(q.item, q.quantity, q.unit) for q in parse_quantities("pyaaz 500 gm")]
+    assert parsed == [("onion", 0.5, "kg")]
+
+
+def test_parse_quantities_unknown_item():
+    [q] = parse_quantities("3 kg xyzzy")
+    assert (q.item, q.sku) == ("", None)
+
@@ -0,0 +1,59 @@
+"""Redaction, payload truncation and the background listener."""
+import io
+import logging
+
+import pytest
+
+from tools.logging_pipeline import (
+    DeferredQueueHandler,
+    Payload,
+    configure_logging,
+    redact,
+    shutdown_logging,
+)
+
+
+@pytest.fixture
+def log_stream():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    stream = io.StringIO()
+    configure_logging(logging.INFO, stream=stream)
+    yield stream
+    shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_redact():
+    text = redact("Ramesh 9876543210, ramesh@example.com, ramesh@okaxis, card 4111 1111 1111 1111")
+    assert text == "Ramesh <phone>, <email>, <upi>, card <number>"
+
+
+def test_redact_leaves_quantities():
+    assert redact("5kg aloo at 60 rupees") == "5kg aloo at 60 rupees"
+
+
+def test_payload_truncation():
+    assert str(Payload("short", limit=10)) == "short"
+    assert str(Payload("x" * 20, limit=10)) == "xxxxxxxxxx... [truncated, 20 chars]"
+
+
+def test_listener_redacts(log_stream):
+    logging.getLogger("test").info("Bill for %s", "9876543210")
+    shutdown_logging()
+    assert "Bill for <phone>" in log_stream.getvalue()
+
+
+def test_bad_record_does_not_kill_listener(log_stream, capsys):
+    # Straight to the queue handler: pytest's own capture handler re-raises format errors
+    queue_handler = next(h for h in logging.getLogger().handlers if isinstance(h, DeferredQueueHandler))
+    logger = logging.getLogger("test")
+    queue_handler.handle(logger.makeRecord("test", logging.INFO, __file__, 0, "%s and %s", ("one",), None))
+    logger.info("still logging")
+    shutdown_logging()
+    assert "still logging" in log_stream.getvalue()
+    assert "Logging error" in capsys.readouterr().err
@@ -0,0 +1,191 @@
+"""Text and SQLite storage backends."""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import tools.storage as storage_module
+from tools.storage import (
+    ROLLUP_DAY_RETENTION_DAYS,
+    InventoryConflict,
+    Movement,
+    RemindersConflict,
+    SQLiteStorage,
+    TextFileStorage,
+    parse_inventory_kb,
+)
+
+KB = "Last Updated: 2025-10-29 01:55:06\nItems:\n- 18 kg potato\n- 6 kg onion"
+
+
+@pytest.fixture(params=["text", "sqlite"])
+def storage(request, tmp_path):
+    text = TextFileStorage(tmp_path / "storage")
+    if request.param == "text":
+        yield text
+        return
+    db = SQLiteStorage(tmp_path / "shop.db", import_from=text)
+    yield db
+    db.close()
+
+
+def add_line(line):
+    return lambda kb_text: f"{kb_text}\n{line}"
+
+
+# -- versioned writes -------------------------------------------------------------
+
+def test_write_with_current_version(storage):
+    kb_text, version = storage.read_inventory_kb_versioned()
+    storage.write_inventory_kb(KB, expected_version=version)
+    assert storage.read_inventory_kb() == KB
+
+
+def test_write_with_stale_version_raises(storage):
+    storage.write_inventory_kb(KB)
+    _, version = storage.read_inventory_kb_versioned()
+    storage.write_inventory_kb(KB + "\n- 1 kg salt")  # another session saves first
+    with pytest.raises(InventoryConflict):
+        storage.write_inventory_kb(KB + "\n- 2 kg rice", expected_version=version)
+    assert storage.read_inventory_kb() == KB + "\n- 1 kg salt"
+
+
+def test_reminders_stale_version_raises(storage):
+    kb_text, version = storage.read_reminders_kb_versioned()
+    storage.write_reminders_kb(kb_text.replace("(Add urgent reminders here)", "Pay rent"))
+    with pytest.raises(RemindersConflict):
+        storage.write_reminders_kb(kb_text, expected_version=version)
+
+
+def test_update_inventory_kb(storage):
+    storage.write_inventory_kb(KB)
+    previous, updated = storage.update_inventory_kb(add_line("- 1 kg salt"))
+    assert previous == KB
+    assert storage.read_inventory_kb() == updated == KB + "\n- 1 kg salt"
+    assert storage.read_inventory_backup() == KB
+
+
+def test_update_inventory_kb_none_leaves_kb(storage):
+    storage.write_inventory_kb(KB)
+    _, version = storage.read_inventory_kb_versioned()
+    assert storage.update_inventory_kb(lambda kb_text: None) == (KB, None)
+    assert storage.read_inventory_kb_versioned() == (KB, version)
+
+
+def test_update_inventory_kb_error_rolls_back(storage):
+    storage.write_inventory_kb(KB)
+
+    def fail(kb_text):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        storage.update_inventory_kb(fail)
+    assert storage.read_inventory_kb() == KB
+
+
+# -- rollups ----------------------------------------------------------------------
+
+def test_rollups_rank_by_quantity_sold(storage):
+    ts = datetime.now()
+    day = ts.strftime("%Y-%m-%d")
+    storage.record_movements([
+        Movement(ts, "onion", "kg", qty_out=10.0),  # spoilage, not a sale
+        Movement(ts, "potato", "kg", qty_sold=2.0, revenue=60.0, source="bill"),
+    ])
+    rows = storage.query_rollups("day", day, day)
+    assert rows == [("potato", "kg", 0.0, 0.0, 2.0, 60.0), ("onion", "kg", 0.0, 10.0, 0.0, 0.0)]
+
+
+def test_text_rollups_prune_old_days(tmp_path):
+    text = TextFileStorage(tmp_path / "storage")
+    old = datetime.now() - timedelta(days=ROLLUP_DAY_RETENTION_DAYS + 30)
+    text.record_movements([Movement(old, "potato", "kg", qty_sold=2.0)])
+    text.record_movements([Movement(datetime.now(), "onion", "kg", qty_sold=1.0)])
+    day, week = old.strftime("%Y-%m-%d"), "{}-W{:02d}".format(*old.isocalendar()[:2])
+    assert text.query_rollups("day", day, day) == []
+    assert text.query_rollups("week", week, week) == [("potato", "kg", 0.0, 0.0, 2.0, 0.0)]
+
+
+def test_text_movements_rotate(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "MOVEMENTS_MAX_BYTES", 1)
+    text = TextFileStorage(tmp_path / "storage")
+    text.record_movements([Movement(datetime.now(), "potato", "kg", qty_sold=2.0)])
+    text.record_movements([Movement(datetime.now(), "onion", "kg", qty_sold=1.0)])
+    assert len(text.movements_file.read_text().splitlines()) == 1
+    assert (text.directory / "movements.jsonl.1").exists()
+
+
+# -- import / export ----------------------------------------------------------------
+
+def test_import_export_round_trip(tmp_path):
+    source = TextFileStorage(tmp_path / "source")
+    source.write_inventory_kb(KB)
+    source.write_inventory_kb(KB + "\n- 1 kg salt", backup=True)
+    source.add_bill("Ramesh", "5kg aloo at 60 rupees", 60.0)
+
+    db = SQLiteStorage(tmp_path / "shop.db")
+    db.import_text(source)
+    assert db.read_inventory_kb() == KB + "\n- 1 kg salt"
+    assert db.read_inventory_backup() == KB
+
+    target = TextFileStorage(tmp_path / "target")
+    db.export_text(target)
+    assert target.read_inventory_kb() == source.read_inventory_kb()
+    assert target.prev_inventory_file.read_text() == KB
+    assert target.read_reminders_kb().strip() == source.read_reminders_kb().strip()
+    assert target.list_bills() == source.list_bills()
+
+
+def test_first_use_imports_text_files(tmp_path):
+    text = TextFileStorage(tmp_path / "storage")
+    text.write_inventory_kb(KB)
+    assert SQLiteStorage(tmp_path / "shop.db", import_from=text).read_inventory_kb() == KB
+
+
+# -- tenants ----------------------------------------------------------------------
+
+def test_text_tenant_directories(tmp_path):
+    text = TextFileStorage(tmp_path / "storage")
+    text.write_inventory_kb(KB)
+    text.set_tenant("shop-42")
+    assert text.directory == tmp_path / "storage" / "tenants" / "shop-42"
+    assert parse_inventory_kb(text.read_inventory_kb())[1][0][0] == ""  # empty default KB
+    text.set_tenant("default")
+    assert text.read_inventory_kb() == KB
+
+
+def test_sqlite_tenant_rows(tmp_path):
+    text = TextFileStorage(tmp_path / "storage")
+    text.write_inventory_kb(KB)
+    db = SQLiteStorage(tmp_path / "shop.db", import_from=text)
+    db.set_tenant("shop-42")  # not seeded from the default tenant's text files
+    db.write_inventory_kb("Last Updated: N/A\nItems:\n- 1 kg salt")
+    db.add_bill("Sita", "1kg namak", 20.0)
+    db.set_tenant("default")
+    assert db.read_inventory_kb() == KB
+    assert db.list_bills() == []
+
+
+def test_invalid_tenant(storage):
+    with pytest.raises(ValueError):
+        storage.set_tenant("../other")
+
+
+# -- schema migration -------------------------------------------------------------
+
+def test_kb_meta_version_migration(tmp_path):
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE kb_meta (tenant TEXT NOT NULL, kind TEXT NOT NULL, label TEXT NOT NULL, "
+        "previous TEXT, PRIMARY KEY (tenant, kind))"
+    )
+    conn.execute("INSERT INTO kb_meta VALUES ('default', 'inventory', 'N/A', NULL)")
+    conn.commit()
+    conn.close()
+
+    db = SQLiteStorage(path)
+    kb_text, version = db.read_inventory_kb_versioned()
+    assert version == 0
+    db.write_inventory_kb(KB, expected_version=version)
+    assert db.read_inventory_kb_versioned() == (KB, 1)
@@ -0,0 +1,228 @@
+# analytics_tool.py
+"""
+Sales and stock-movement analytics.
+
+Every inventory change and every bill is turned into Movement events which
+the storage backend folds into per-item daily and weekly rollups as they are
+recorded. Questions like "is hafte kitna aloo bika" or "sabse zyada kya bikta
+hai" are answered from those rollups alone - no raw history scan, no LLM.
+"""
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from tools.catalog import (
+    canonical_item,
+    canonical_unit,
+    convert,
+    count_unit,
+    format_quantity,
+    normalize_quantity,
+    resolve_item,
+)
+from tools.storage import Movement, RollupRow, get_storage, parse_inventory_kb
+from tools.units import UNIT_PATTERN
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("today", "yesterday", "week", "last_week", "last_7_days", "month")
+
+PERIOD_LABELS = {
+    "today": "today",
+    "yesterday": "yesterday",
+    "week": "this week",
+    "last_week": "last week",
+    "last_7_days": "in the last 7 days",
+    "month": "this month",
+}
+
+BILL_ITEM_RE = re.compile(
+    rf"^\s*(?P<qty>\d+(?:\.\d+)?)(?:\s*(?P<unit>{UNIT_PATTERN}))?\s+(?P<item>[^\W\d_][^\d@₹]*?)"
+    r"(?:\s*(?:\bat\b|@|\bfor\b|\bka\b|\bke\b)\s*(?:rs\.?|₹)?\s*(?P<price>\d+(?:\.\d+)?)"
+    r"\s*(?:rupees|rupee|rupaye|rs\.?|₹)?\s*(?P<per>(?:\bper\b|/)\s*[^\W\d_]+)?)?\s*$",
+    re.IGNORECASE,
+)
+BILL_SPLIT_RE = re.compile(r",|;|\band\b|\baur\b", re.IGNORECASE)
+
+
+# ---------------------------------------------------------------------------
+# Capture
+# ---------------------------------------------------------------------------
+
+def _stock_levels(kb_text: str) -> dict:
+    levels = {}
+    _, rows = parse_inventory_kb(kb_text)
+    for item, quantity, unit, _, _ in rows:
+        if not item or quantity is None:
+            continue
+        name = canonical_item(item)
+        quantity, unit = normalize_quantity(quantity, unit, name)
+        key = (name, unit)
+        levels[key] = levels.get(key, 0.0) + quantity
+    return levels
+
+
+def inventory_movements(old_kb: str, new_kb: str, ts: Optional[datetime] = None,
+                        sold: bool = False) -> List[Movement]:
+    """Diff two inventory KBs into per-item stock in/out movements.
+
+    With `sold`, stock that went down is counted as sold rather than as other
+    stock out (use, spoilage, recounts).
+    """
+    ts = ts or datetime.now()
+    old, new = _stock_levels(old_kb), _stock_levels(new_kb)
+    movements = []
+    for key in old.keys() | new.keys():
+        delta = new.get(key, 0.0) - old.get(key, 0.0)
+        if delta == 0:
+            continue
+        item, unit = key
+        if delta > 0:
+            movements.append(Movement(ts, item, unit, qty_in=delta))
+        elif sold:
+            movements.append(Movement(ts, item, unit, qty_sold=-delta))
+        else:
+            movements.append(Movement(ts, item, unit, qty_out=-delta))
+    return movements
+
+
+def split_bill_items(items: str) -> Tuple[List[Tuple[str, float, str, Optional[float]]], List[str]]:
+    """Parse '5kg aloo at 60 rupees, 2kg pyaaz at 20 per kg'.
+
+    Returns ([(item, qty, unit, amount)], [parts that didn't parse]).
+    """
+    parsed = []
+    unparsed = []
+    for part in BILL_SPLIT_RE.split(items):
+        if not part.strip():
+            continue
+        match = BILL_ITEM_RE.match(part)
+        if not match:
+            unparsed.append(part.strip())
+            continue
+        qty = float(match.group("qty"))
+        item = canonical_item(match.group("item"))
+        sku = resolve_item(item)
+        # "6 kele" is 6 pieces; "5 aloo" stays without a unit
+        unit = canonical_unit(match.group("unit")) or (count_unit(sku) if sku else None) or ""
+        price = match.group("price")
+        amount = None
+        if price is not None:
+            # "at 60 rupees" is the line amount; "at 20 per kg" / "20/kg" is a unit price
+            amount = float(price)
+            per = match.group("per")
+            if per:
+                per_unit = canonical_unit(per.split()[-1].lstrip("/"))
+                per_qty = convert(qty, unit, per_unit) if unit else None
+                amount *= qty if per_qty is None else per_qty
+        qty, unit = normalize_quantity(qty, unit, item)
+        parsed.append((item, qty, unit, amount))
+    return parsed, unparsed
+
+
+def parse_bill_items(items: str) -> List[Tuple[str, float, str, Optional[float]]]:
+    """The (item, qty, unit, amount) lines of a bill that parsed."""
+    return split_bill_items(items)[0]
+
+
+def bill_total(items: str) -> Optional[float]:
+    """Sum of the line amounts, or None unless every line parsed and has an amount."""
+    parsed, unparsed = split_bill_items(items)
+    if unparsed:
+        logger.warning("Bill lines not understood, no total: %s", unparsed)
+        return None
+    missing = [item for item, _, _, amount in parsed if amount is None]
+    if missing or not parsed:
+        logger.warning("Bill lines without a price, no total: %s", missing)
+        return None
+    return sum(amount for _, _, _, amount in parsed)
+
+
+def bill_movements(items: str, ts: Optional[datetime] = None) -> List[Movement]:
+    ts = ts or datetime.now()
+    return [
+        Movement(ts, item, unit, qty_sold=qty, revenue=amount or 0.0, source="bill")
+        for item, qty, unit, amount in parse_bill_items(items)
+    ]
+
+
+def record_inventory_change(old_kb: str, new_kb: str, sold: bool = False):
+    get_storage().record_movements(inventory_movements(old_kb, new_kb, sold=sold))
+
+
+def record_bill(items: str):
+    get_storage().record_movements(bill_movements(items))
+
+
+# ---------------------------------------------------------------------------
+# Query API
+# ---------------------------------------------------------------------------
+
+def _week_bucket(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def period_range(period: str, today: Optional[date] = None) -> Tuple[str, str, str]:
+    """Map a period name to (rollup period, first bucket, last bucket)."""
+    today = today or date.today()
+    if period == "today":
+        return "day", today.isoformat(), today.isoformat()
+    if period == "yesterday":
+        day = (today - timedelta(days=1)).isoformat()
+        return "day", day, day
+    if period == "week":
+        bucket = _week_bucket(today)
+        return "week", bucket, bucket
+    if period == "last_week":
+        bucket = _week_bucket(today - timedelta(days=7))
+        return "week", bucket, bucket
+    if period == "last_7_days":
+        return "day", (today - timedelta(days=6)).isoformat(), today.isoformat()
+    if period == "month":
+        return "day", today.replace(day=1).isoformat(), today.isoformat()
+    raise ValueError(f"Unknown period: {period!r} (expected one of {', '.join(PERIODS)})")
+
+
+def item_summary(item: str, period: str = "week") -> List[RollupRow]:
+    """Rollup rows (one per unit) for a single item over `period`."""
+    return get_storage().query_rollups(*period_range(period), item=canonical_item(item))
+
+
+def top_items(period: str = "week", limit: int = 5) -> List[RollupRow]:
+    """Items ranked by quantity sold over `period`; other stock out doesn't count as sales."""
+    rows = [r for r in get_storage().query_rollups(*period_range(period)) if r[4]]
+    return rows[:limit]
+
+
+def sales_report(item: str = "", period: str = "week") -> str:
+    """Plain-language answer for the voice agent."""
+    label = PERIOD_LABELS.get(period, period)
+    if item:
+        rows = item_summary(item, period)
+        if not rows:
+            return f"No sales or stock movement recorded for {item} {label}."
+        parts = []
+        for _, unit, qty_in, qty_out, qty_sold, revenue in rows:
+            if qty_sold:
+                sold = f"sold {format_quantity(qty_sold, unit)}"
+                if revenue:
+                    sold += f" for {revenue:g} rupees"
+                parts.append(sold)
+            if qty_out:
+                parts.append(f"{format_quantity(qty_out, unit)} used or written off")
+            if qty_in:
+                parts.append(f"{format_quantity(qty_in, unit)} was added")
+        return f"{canonical_item(item).capitalize()} {label}: " + ", ".join(parts) + "."
+
+    rows = top_items(period)
+    if not rows:
+        return f"No sales recorded {label}."
+    ranked = []
+    for rank, (name, unit, _, _, qty_sold, revenue) in enumerate(rows, start=1):
+        entry = f"{rank}. {name} {format_quantity(qty_sold, unit)}"
+        if revenue:
+            entry += f" ({revenue:g} rupees)"
+        ranked.append(entry)
+    return f"Top selling items {label}: " + ", ".join(ranked) + "."
@@ -0,0 +1,298 @@
+# catalog.py
+"""
+Canonical item catalog: SKUs, Hindi/English/transliteration aliases and units
+(the unit table itself lives in tools/units.py).
+
+Everything is precomputed into dict indexes at import time, so resolving
+"aloo" -> potato or "500 gm" -> 0.5 kg is a couple of dict lookups and never
+needs the LLM:
+
+- resolve_item("pyaaz")                 -> Sku(name="onion", unit="kg", ...)
+- normalize_quantity(500, "gm", "jeera") -> (0.5, "kg")
+- parse_quantities("5kg aloo aur 2 packet maida add karo")
+- canonicalize_kb(kb_text) rewrites "- 7 kilo gobhi" as "- 7 kg cauliflower"
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from tools.storage import parse_inventory_kb, render_inventory_kb
+from tools.units import UNIT_ALIASES, UNITS, Unit, canonical_unit, convert  # noqa: F401 (re-exported)
+
+
+class Sku(NamedTuple):
+    name: str
+    unit: str
+    aliases: Tuple[str, ...] = ()
+
+
+class ItemQuantity(NamedTuple):
+    """A quantity mentioned in free text, converted to the SKU's unit where possible.
+
+    A bare number ("5 aloo") for an item sold by weight or volume keeps unit ''.
+    """
+    item: str
+    quantity: float
+    unit: str
+    sku: Optional[Sku]
+
+
+CATALOG = [
+    # Vegetables
+    Sku("potato", "kg", ("aloo", "alu", "aaloo", "batata", "potatoes")),
+    Sku("onion", "kg", ("pyaaz", "pyaz", "piyaz", "pyaj", "kanda", "onions")),
+    Sku("tomato", "kg", ("tamatar", "tomatoes")),
+    # "bobi" is how STT often hears "gobi"
+    Sku("cauliflower", "kg", ("gobhi", "gobi", "bobi", "phool gobhi", "phool gobi", "phoolgobhi")),
+    Sku("cabbage", "kg", ("patta gobhi", "patta gobi", "band gobhi", "bandh gobhi", "bandgobhi")),
+    Sku("peas", "kg", ("matar", "mutter", "green peas")),
+    Sku("spinach", "kg", ("palak",)),
+    Sku("brinjal", "kg", ("baingan", "baigan", "eggplant")),
+    Sku("okra", "kg", ("bhindi", "lady finger", "ladyfinger")),
+    Sku("ginger", "kg", ("adrak",)),
+    Sku("garlic", "kg", ("lehsun", "lahsun", "lasun")),
+    Sku("green chilli", "kg", ("hari mirch", "green chili", "green chillies")),
+    Sku("coriander leaves", "kg", ("dhaniya patta", "hara dhaniya")),
+    # Fruit
+    Sku("banana", "dozen", ("kela", "kele", "bananas")),
+    Sku("apple", "kg", ("seb", "apples")),
+    # Dairy
+    Sku("milk", "litre", ("doodh", "dudh", "dood")),
+    Sku("curd", "kg", ("dahi", "card", "curds", "yogurt", "yoghurt")),
+    Sku("paneer", "kg", ("cottage cheese",)),
+    Sku("butter", "kg", ("makhan", "makkhan")),
+    Sku("ghee", "kg", ("desi ghee",)),
+    Sku("eggs", "pc", ("egg", "anda", "ande", "unda")),
+    # Staples
+    Sku("rice", "kg", ("chawal", "chaawal", "chaval")),
+    Sku("wheat flour", "kg", ("atta", "aata", "gehun atta", "gehu atta")),
+    Sku("maida", "kg", ("refined flour", "all purpose flour")),
+    Sku("gram flour", "kg", ("besan",)),
+    Sku("semolina", "kg", ("suji", "sooji", "rava", "rawa")),
+    Sku("sugar", "kg", ("chini", "cheeni", "shakkar")),
+    Sku("salt", "kg", ("namak",)),
+    Sku("toor dal", "kg", ("arhar dal", "tur dal", "toor", "arhar")),
+    Sku("moong dal", "kg", ("moong", "mung dal")),
+    Sku("chana dal", "kg", ("chana",)),
+    Sku("masoor dal", "kg", ("masoor", "lal dal")),
+    Sku("dal", "kg", ("daal", "lentils")),
+    Sku("poha", "kg", ("chivda", "flattened rice")),
+    # Oils and spices
+    Sku("mustard oil", "litre", ("sarson tel", "sarson ka tel", "sarso tel")),
+    Sku("cooking oil", "litre", ("tel", "oil", "refined oil", "refined")),
+    Sku("turmeric", "kg", ("haldi",)),
+    Sku("red chilli powder", "kg", ("lal mirch", "mirchi powder", "chilli powder")),
+    Sku("cumin", "kg", ("jeera", "zeera", "jira")),
+    Sku("coriander powder", "kg", ("dhaniya", "dhania")),
+    Sku("tea", "kg", ("chai patti", "chai", "patti", "tea leaves")),
+    # Packaged goods
+    # Not "pav"/"pao": in "1 pao aloo" that's a quarter kilo (tools/units.py)
+    Sku("bread", "packet", ("double roti",)),
+    Sku("biscuits", "packet", ("biscuit", "biskut")),
+    Sku("detergent", "packet", ("surf", "washing powder")),
+    Sku("soap", "pc", ("sabun", "saabun")),
+    Sku("polythene", "kg", ("polythene bag", "polybag", "thaili", "panni")),
+]
+
+TOKEN_RE = re.compile(r"\d+(?:\.\d+)?|[^\W\d_]+")
+
+
+def _build_alias_index() -> Tuple[Dict[Tuple[str, ...], Sku], int]:
+    index: Dict[Tuple[str, ...], Sku] = {}
+    for sku in CATALOG:
+        for alias in (sku.name, *sku.aliases):
+            index.setdefault(tuple(alias.split()), sku)
+    return index, max(len(key) for key in index)
+
+
+# alias words -> Sku; free text is matched longest alias first
+_ALIAS_INDEX, _MAX_ALIAS_WORDS = _build_alias_index()
+
+
+def resolve_item(name: str) -> Optional[Sku]:
+    """Look up an item by canonical name or alias (case/whitespace-insensitive)."""
+    return _ALIAS_INDEX.get(tuple(name.lower().split()))
+
+
+def canonical_item(name: str) -> str:
+    """Canonical SKU name, or the normalized input when the item isn't in the catalog."""
+    sku = resolve_item(name)
+    return sku.name if sku else " ".join(name.lower().split())
+
+
+def count_unit(sku: Sku) -> Optional[str]:
+    """What a bare number means for `sku`: pieces ("2 kela") or packets; None for weights/volumes."""
+    base = UNITS[sku.unit].base
+    return base if base in ("pc", "packet") else None
+
+
+def normalize_quantity(quantity: float, unit: Optional[str], item: str) -> Tuple[float, str]:
+    """Express a quantity in the item's SKU unit where possible, else in its canonical unit.
+
+    A bare number is a count of pieces or packets; for an item sold by weight
+    or volume it is left without a unit rather than guessed.
+    """
+    unit = canonical_unit(unit)
+    sku = resolve_item(item)
+    if sku is not None:
+        unit = unit or count_unit(sku) or ""
+        converted = convert(quantity, unit, sku.unit)
+        if converted is not None:
+            return round(converted, 6), sku.unit
+    return quantity, unit
+
+
+def unit_conflicts(kb_text: str) -> List[Tuple[str, str, str]]:
+    """Catalog items kept in a unit that doesn't convert to theirs: (item, unit, usual unit).
+
+    canonicalize_kb() can't fix these ("- 7 kg milk" when milk is sold in
+    litres); the shopkeeper has to say which one is right.
+    """
+    conflicts = []
+    _, rows = parse_inventory_kb(kb_text)
+    for item, quantity, unit, _, _ in rows:
+        sku = resolve_item(item) if item and quantity is not None else None
+        if sku is None:
+            continue
+        unit = canonical_unit(unit) or count_unit(sku) or ""
+        if convert(1.0, unit, sku.unit) is None and (sku.name, unit, sku.unit) not in conflicts:
+            conflicts.append((sku.name, unit, sku.unit))
+    return conflicts
+
+
+def format_quantity(quantity: float, unit: str) -> str:
+    return f"{round(quantity, 3):g} {unit}".strip()
+
+
+def _match_item(tokens: List[str], start: int) -> Tuple[Optional[Sku], int]:
+    """Longest alias starting at tokens[start]; returns (sku, words consumed)."""
+    for n in range(min(_MAX_ALIAS_WORDS, len(tokens) - start), 0, -1):
+        sku = _ALIAS_INDEX.get(tuple(tokens[start:start + n]))
+        if sku is not None:
+            return sku, n
+    return None, 0
+
+
+def _match_item_before(tokens: List[str], end: int) -> Tuple[Optional[Sku], int]:
+    """Longest alias ending just before tokens[end]."""
+    for n in range(min(_MAX_ALIAS_WORDS, end), 0, -1):
+        sku = _ALIAS_INDEX.get(tuple(tokens[end - n:end]))
+        if sku is not None:
+            return sku, n
+    return None, 0
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words and numbers; '5kg' splits into '5', 'kg'."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def find_items(text: str) -> List[Sku]:
+    """Every catalog item mentioned in `text`, in order, without duplicates."""
+    tokens = tokenize(text)
+    found: List[Sku] = []
+    i = 0
+    while i < len(tokens):
+        sku, n = _match_item(tokens, i)
+        if sku is None:
+            i += 1
+            continue
+        if sku not in found:
+            found.append(sku)
+        i += n
+    return found
+
+
+def parse_quantities(text: str) -> List[ItemQuantity]:
+    """Quantities in free text: '5kg aloo', '2 packet maida', 'pyaaz 500 gm'.
+
+    A number whose item can't be resolved is returned with item '' and sku None,
+    so callers can tell the text wasn't fully understood.
+    """
+    tokens = tokenize(text)
+    results: List[ItemQuantity] = []
+    consumed = set()
+    for i, token in enumerate(tokens):
+        if not token[0].isdigit():
+            continue
+        quantity = float(token)
+        j = i + 1
+        unit = ""
+        if j < len(tokens) and tokens[j] in UNIT_ALIASES:
+            unit = UNIT_ALIASES[tokens[j]]
+            j += 1
+        sku, n = _match_item(tokens, j)
+        span = range(j, j + n)
+        if sku is None:
+            sku, n = _match_item_before(tokens, i)
+            span = range(i - n, i)
+        if sku is None or any(k in consumed for k in span):
+            results.append(ItemQuantity("", quantity, unit, None))
+            continue
+        consumed.update(span)
+        # "2 kela" is 2 pieces; "5 aloo" has no unit and is left to the LLM
+        unit = unit or count_unit(sku) or ""
+        converted = convert(quantity, unit, sku.unit)
+        if converted is not None:
+            quantity, unit = round(converted, 6), sku.unit
+        results.append(ItemQuantity(sku.name, quantity, unit, sku))
+    return results
+
+
+def merge_details(first: Optional[str], second: Optional[str]) -> Optional[str]:
+    """Combine two lines' details, e.g. 'price: 12' + 'supplier: Ram'.
+
+    Returns None when they disagree (the same key with different values), in
+    which case the lines shouldn't be merged.
+    """
+    parts = [p.strip() for p in (first or "").split(",") if p.strip()]
+    keys = {p.split(":", 1)[0].strip().lower(): p for p in parts}
+    for part in (p.strip() for p in (second or "").split(",")):
+        if not part or part in parts:
+            continue
+        key = part.split(":", 1)[0].strip().lower()
+        if key in keys:
+            return None
+        keys[key] = part
+        parts.append(part)
+    return ", ".join(parts)
+
+
+def canonicalize_kb(kb_text: str) -> str:
+    """Rewrite inventory lines with canonical item names/units, merging duplicates.
+
+    Duplicates whose details conflict (two different prices) stay on separate
+    lines; apply_fast_path() then leaves that item to the LLM.
+    """
+    label, rows = parse_inventory_kb(kb_text)
+    lines: List[Optional[str]] = []
+    merged: Dict[Tuple[str, str], int] = {}  # (item, unit) -> index into entries
+    entries: List[List] = []  # [item, quantity, unit, details]
+    for item, quantity, unit, details, line in rows:
+        if not item or quantity is None:
+            lines.append(line)
+            continue
+        name = canonical_item(item)
+        quantity, unit = normalize_quantity(quantity, unit, name)
+        key = (name, unit)
+        if key in merged:
+            entry = entries[merged[key]]
+            combined = merge_details(entry[3], details)
+            if combined is not None:
+                entry[1] += quantity
+                entry[3] = combined
+                continue
+        else:
+            merged[key] = len(entries)
+        entries.append([name, quantity, unit, details])
+        lines.append(None)  # placeholder, filled from entries in order
+
+    it = iter(entries)
+    rendered = []
+    for line in lines:
+        if line is not None:
+            rendered.append(line)
+            continue
+        name, quantity, unit, details = next(it)
+        text = f"- {format_quantity(quantity, unit)} {name}"
+        rendered.append(f"{text} ({details})" if details else text)
+    return render_inventory_kb(label, rendered)
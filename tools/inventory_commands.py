@@ -0,0 +1,125 @@
+# inventory_commands.py
+"""
+Deterministic fast path for simple inventory requests.
+
+"5kg aloo add karo", "2 kilo pyaaz becha" or "kitna aloo bacha hai" are
+applied to the KB text without an LLM call. Anything that isn't clearly one
+add/remove/set (prices, negations, questions about past changes, unknown
+items, units that don't convert) returns None and goes to the LLM.
+
+Only depends on the catalog and the KB text format, so it can be tested
+without the LLM stack.
+"""
+import re
+from typing import Dict, Optional, Tuple
+
+from tools.catalog import find_items, format_quantity, parse_quantities, tokenize
+from tools.storage import parse_inventory_kb, render_inventory_kb
+
+APOSTROPHE_RE = re.compile(r"['\u2019]")
+
+# Intent words for the deterministic fast path (Hinglish + English)
+ADD_WORDS = {"add", "added", "jodo", "jod", "daalo", "dalo", "liya", "liye", "laya", "laye", "aaya",
+             "aaye", "aya", "aye", "kharida", "kharide", "bought", "buy", "received", "plus", "more"}
+REMOVE_WORDS = {"kam", "ghatao", "ghata", "sold", "sell", "bika", "bike", "becha", "beche", "bech",
+                "used", "use", "nikala", "nikalo", "remove", "subtract", "minus", "hatao"}
+SET_WORDS = {"bacha", "bache", "bachi", "baki", "baaki", "left", "remaining", "set"}
+QUERY_WORDS = {"kitna", "kitne", "kitni", "how", "much", "many", "check", "batao", "bataiye"}
+# Anything about prices, suppliers or expiry goes to the LLM
+METADATA_WORDS = {"price", "prices", "rate", "rupee", "rupees", "rupay", "rupaye", "rs", "daam",
+                  "bhav", "supplier", "expiry", "expire", "expires", "mrp"}
+# "5 kg aloo add mat karo", "dont add 5 kg aloo", "5 kg aloo nahi bika" must not change stock
+NEGATION_WORDS = {"mat", "nahi", "nahin", "nhi", "na", "not", "no", "never", "dont", "didnt", "doesnt"}
+# "kya maine 5 kg aloo add kiya tha?" asks about a change rather than making one
+QUESTION_WORDS = QUERY_WORDS | {"kya", "kyun", "kab", "did", "what"}
+# Removals that are sales ("2 kilo pyaaz becha") rather than use or spoilage
+SALE_WORDS = {"sold", "sell", "bika", "bike", "becha", "beche", "bech"}
+
+
+def is_sale(user_prompt: str) -> bool:
+    """True if a fast-path removal for `user_prompt` is a sale."""
+    return bool(set(tokenize(user_prompt)) & SALE_WORDS)
+
+
+def apply_fast_path(user_prompt: str, current_kb: str) -> Optional[Tuple[Optional[str], str]]:
+    """
+    Handle simple stock updates and lookups without the LLM.
+
+    Returns (updated_kb or None if nothing changed, response), or None when the
+    request isn't unambiguous enough and should go to the LLM.
+    """
+    # "don't" -> "dont" so contractions match NEGATION_WORDS
+    words = set(tokenize(APOSTROPHE_RE.sub("", user_prompt)))
+    if words & METADATA_WORDS or words & NEGATION_WORDS:
+        return None
+    intents = [name for name, vocab in (("add", ADD_WORDS), ("remove", REMOVE_WORDS), ("set", SET_WORDS))
+               if words & vocab]
+
+    label, rows = parse_inventory_kb(current_kb)
+    stock: Dict[str, int] = {}
+    for index, (item, quantity, _, _, _) in enumerate(rows):
+        if item and quantity is not None:
+            if item in stock:
+                return None  # same item kept in two units, let the LLM sort it out
+            stock[item] = index
+
+    quantities = parse_quantities(user_prompt)
+    if not quantities:
+        items = find_items(user_prompt)
+        # "kitna aloo bacha hai" is a question, not a set
+        if set(intents) - {"set"} or not items or not words & QUERY_WORDS:
+            return None
+        answers = []
+        for sku in items:
+            if sku.name in stock:
+                _, quantity, unit, _, _ = rows[stock[sku.name]]
+                if unit != sku.unit:
+                    return None  # e.g. milk stored in kg; the LLM flags it
+                answers.append(f"{sku.name}: {format_quantity(quantity, unit or '')} in stock")
+            else:
+                answers.append(f"{sku.name}: not in stock")
+        response = "; ".join(answers)
+        return None, response[0].upper() + response[1:] + "."
+
+    if "?" in user_prompt or words & QUESTION_WORDS:
+        return None
+    # Unknown items, and units that don't fit the item ("7 kg milk"), go to the LLM
+    if len(intents) != 1 or any(q.sku is None or q.unit != q.sku.unit for q in quantities):
+        return None
+    intent = intents[0]
+
+    rows = [list(row) for row in rows]
+    changes = []
+    for q in quantities:
+        if q.item in stock:
+            row = rows[stock[q.item]]
+            unit, delta, old = row[2] or "", q.quantity, row[1]
+            if unit != q.unit:
+                return None  # stock kept in another unit than the item's
+
+        else:
+            if intent == "remove":
+                return None
+            unit, delta, old = q.unit, q.quantity, 0.0
+            stock[q.item] = len(rows)
+            rows.append([q.item, 0.0, unit, None, ""])
+            row = rows[-1]
+
+        new = old + delta if intent == "add" else old - delta if intent == "remove" else delta
+        if new < 0:
+            return None
+        row[1], row[2] = new, unit
+        text = f"- {format_quantity(new, unit)} {q.item}"
+        row[4] = f"{text} ({row[3]})" if row[3] else text
+
+        amount = format_quantity(q.quantity, q.unit)
+        if intent == "add":
+            changes.append(f"added {amount} {q.item}, now {format_quantity(new, unit)}")
+        elif intent == "remove":
+            changes.append(f"removed {amount} {q.item}, {format_quantity(new, unit)} left")
+        else:
+            changes.append(f"{q.item} set to {format_quantity(new, unit)}")
+
+    updated_kb = render_inventory_kb(label, [row[4] for row in rows])
+    response = "; ".join(changes)
+    return updated_kb, response[0].upper() + response[1:] + "."
@@ -6,38 +6,32 @@ import logging
 import re
 import threading
 from datetime import datetime
-from pathlib import Path
+from typing import Optional
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from langchain.chat_models import init_chat_model
 from langchain.schema import HumanMessage
 from langchain.tools import tool
 
+from tools.analytics_tool import record_inventory_change
+from tools.catalog import canonicalize_kb, find_items, format_quantity, parse_quantities, unit_conflicts
+from tools.inventory_commands import apply_fast_path, is_sale
+from tools.logging_pipeline import log_payload, sample_payloads
+from tools.storage import InventoryConflict, get_storage
+
 # Load environment variables
 load_dotenv()
 os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGCHAIN_API_KEY")
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
-# Configure logging
-logging.basicConfig(
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    level=logging.INFO
-)
+# Logging is configured once by agent.py (tools/logging_pipeline.py)
 logger = logging.getLogger(__name__)
 
 # Initialize LLM
 llm = init_chat_model("gemini-2.0-flash", model_provider="google_genai", temperature=0)
 
-# Knowledge‐base file
-KB_FILE = Path("storage/inventory_kb.txt")
-PREV_KB_FILE = Path("storage/inventory_kb_prev.txt")
-
-# Ensure storage directory exists
-KB_FILE.parent.mkdir(exist_ok=True)
-
-if not KB_FILE.exists():
-    KB_FILE.write_text("Last Updated: N/A\nItems:\n(Add items with format: - quantity item (price: X, other details))\n")
-    logger.info("Created inventory_kb.txt")
+# Storage backend (text files by default, SQLite with STORAGE_BACKEND=sqlite)
+storage = get_storage()
 
 
 class InventoryLLMResponse(BaseModel):
@@ -48,34 +42,37 @@ class InventoryLLMResponse(BaseModel):
 
 def read_kb() -> str:
     """Read the entire knowledge base text."""
-    return KB_FILE.read_text()
+    return storage.read_inventory_kb()
+
+
+def read_kb_versioned():
+    """Read the KB together with the version token write_kb_with_backup() checks."""
+    return storage.read_inventory_kb_versioned()
 
 
 def write_kb(updated_kb: str):
     """Overwrite the knowledge base with updated text."""
-    KB_FILE.write_text(updated_kb)
+    storage.write_inventory_kb(updated_kb)
     logger.info("Updated KB")
 
 
-def write_kb_with_backup(updated_kb: str):
-    """Save previous KB then write the new KB."""
-    try:
-        prev = read_kb()
-    except Exception:
-        prev = ""
-    try:
-        PREV_KB_FILE.write_text(prev)
-    except Exception as e:
-        logger.warning("Failed to write previous KB backup: %s", e)
-    write_kb(updated_kb)
+def write_kb_with_backup(updated_kb: str, expected_version=None):
+    """Save previous KB then write the new KB.
+
+    With `expected_version`, raises InventoryConflict if another session
+    changed the KB since it was read.
+    """
+    storage.write_inventory_kb(updated_kb, backup=True, expected_version=expected_version)
+    logger.info("Updated KB")
 
 
 def call_llm(prompt: str) -> str:
     """Invoke the LLM and return its text response."""
-    logger.info("LLM prompt: %s", prompt)
+    sampled = sample_payloads()  # log prompt and response together, or neither
+    log_payload(logger, "LLM prompt", prompt, sampled=sampled)
     resp = llm.invoke([HumanMessage(content=prompt)])
     text = resp.content if hasattr(resp, "content") else str(resp)
-    logger.info("LLM response: %s", text)
+    log_payload(logger, "LLM response", text, sampled=sampled)
     return text.strip()
 
 
@@ -125,30 +122,64 @@ def ensure_kb_header(kb_text: str) -> str:
     return kb
 
 
-# WRAPPER TOOL - Uses your EXACT inventory_mcp.py logic!
-@tool
-def process_inventory(user_prompt: str) -> str:
+def record_change_in_background(previous_kb: str, updated_kb: str):
+    """Record stock movements for a saved KB change off the calling thread."""
+    def record_in_background():
+        try:
+            record_inventory_change(previous_kb, updated_kb)
+        except Exception as e:
+            logger.error(f"❌ Failed to record stock movements: {e}")
+
+    threading.Thread(target=record_in_background, daemon=True).start()
+
+
+def apply_fast_path_in_background(user_prompt: str):
     """
-    Process inventory requests using the proven inventory_mcp.py logic.
-    Handles multiple operations efficiently in a single LLM call.
-    
-    Examples:
-    - "10kg aloo liya"
-    - "add 2kg aloo, tell me how much besan, subtract 3kg onion"
-    - "kitna aloo bacha hai"
-    - "complete inventory dikhao"
-    - "aloo ki price 15 rupay kilo"
-    
-    Args:
-        user_prompt: Natural language inventory request
-    
-    Returns:
-        Response from inventory processing
+    Re-apply a fast-path update to the latest KB and save it off the calling thread.
+
+    The read-modify-write runs inside storage.update_inventory_kb(), so two
+    sessions adding stock at the same time both land.
     """
-    # EXACT COPY of your inventory_mcp.py logic!
-    
-    # 1. Read current KB
-    current_kb = read_kb()
+    def update(stored_kb: str) -> Optional[str]:
+        fast = apply_fast_path(user_prompt, canonicalize_kb(stored_kb))
+        if fast is None or fast[0] is None:
+            logger.warning("KB changed underneath a fast-path update, not applied: %s", user_prompt)
+            return None
+        return ensure_kb_header(fast[0])
+
+    def write_in_background():
+        try:
+            previous_kb, updated_kb = storage.update_inventory_kb(update, backup=True)
+        except Exception as e:
+            logger.error(f"❌ Failed to save KB in background: {e}")
+            return
+        if updated_kb is None:
+            return
+        logger.info("✅ KB saved successfully in background")
+        try:
+            record_inventory_change(previous_kb, updated_kb, sold=is_sale(user_prompt))
+        except Exception as e:
+            logger.error(f"❌ Failed to record stock movements: {e}")
+
+    # Start background write thread (daemon=True means it won't block program exit)
+    write_thread = threading.Thread(target=write_in_background, daemon=True)
+    write_thread.start()
+
+
+def ask_llm(user_prompt: str, current_kb: str) -> Optional[InventoryLLMResponse]:
+    """Ask the LLM to apply `user_prompt` to `current_kb`; None if its output is unusable."""
+    quantities = [q for q in parse_quantities(user_prompt) if q.sku]
+    resolved = [
+        f"- {q.item}: {format_quantity(q.quantity, q.unit)}"
+        + (f" (usually sold in {q.sku.unit}, check with the shopkeeper)" if q.unit != q.sku.unit else "")
+        for q in quantities
+    ]
+    resolved += [f"- {sku.name}" for sku in find_items(user_prompt) if sku.name not in {q.item for q in quantities}]
+    resolved_items = "\n".join(resolved) or "(none)"
+    unit_notes = "\n".join(
+        f"- {item}: stored {f'in {unit}' if unit else 'without a unit'}, usually {usual}"
+        for item, unit, usual in unit_conflicts(current_kb)
+    ) or "(none)"
 
     # 2. Build instruction for LLM (your EXACT prompt)
     instruction = f"""
@@ -172,6 +203,13 @@ METADATA (prices, suppliers, expiry, etc.):
 - Keep it simple and human-readable
 - Update existing metadata or add new metadata as user provides information
 
+ITEM NAMES:
+- Use the canonical English item names and units from the KB and the resolved items below
+  (e.g. "potato" not "aloo", "kg" not "kilo")
+- If the request changes an item listed under unit mismatches, or gives a quantity marked
+  "check with the shopkeeper", don't guess a conversion: set needs_confirmation to true and
+  ask which unit is right
+
 QUESTIONS:
 - If the user asks a question about the inventory, provide a concise answer.
 
@@ -191,6 +229,12 @@ Current inventory note (KB):
 User prompt:
 {user_prompt}
 
+Resolved items in the user prompt (canonical name: quantity):
+{resolved_items}
+
+Unit mismatches in the KB (item: stored unit vs. usual unit):
+{unit_notes}
+
 Output:
 Return only the JSON object described above. No explanations.
 """
@@ -210,27 +254,71 @@ Return only the JSON object described above. No explanations.
             result = InventoryLLMResponse(**parsed)
     except Exception as e:
         logger.error("Invalid LLM output: %s", e)
-        return "Sorry, I couldn't process that inventory request."
+        return None
+    return result
 
-    updated_kb = result.kb
-    user_response = result.response
-    llm_needs_confirmation = result.needs_confirmation
 
-    # 6. Check if confirmation is needed
-    if llm_needs_confirmation:
-        return f"{user_response} (Confirmation needed)"
-
-    # 7. Write new KB with backup in background thread (non-blocking)
-    def write_in_background():
-        try:
-            write_kb_with_backup(ensure_kb_header(updated_kb))
-            logger.info("✅ KB saved successfully in background")
-        except Exception as e:
-            logger.error(f"❌ Failed to save KB in background: {e}")
+# WRAPPER TOOL - Uses your EXACT inventory_mcp.py logic!
+@tool
+def process_inventory(user_prompt: str) -> str:
+    """
+    Process inventory requests using the proven inventory_mcp.py logic.
+    Handles multiple operations efficiently in a single LLM call.
     
-    # Start background write thread (daemon=True means it won't block program exit)
-    write_thread = threading.Thread(target=write_in_background, daemon=True)
-    write_thread.start()
+    Examples:
+    - "10kg aloo liya"
+    - "add 2kg aloo, tell me how much besan, subtract 3kg onion"
+    - "kitna aloo bacha hai"
+    - "complete inventory dikhao"
+    - "aloo ki price 15 rupay kilo"
+    
+    Args:
+        user_prompt: Natural language inventory request
+    
+    Returns:
+        Response from inventory processing
+    """
+    # EXACT COPY of your inventory_mcp.py logic!
+    
+    # 1. Read current KB (canonical item names and units) and its version
+    stored_kb, version = read_kb_versioned()
+    current_kb = canonicalize_kb(stored_kb)
+
+    # 1b. Simple updates / lookups are resolved deterministically, no LLM call
+    fast = apply_fast_path(user_prompt, current_kb)
+    if fast is not None:
+        updated_kb, user_response = fast
+        if updated_kb is not None:
+            apply_fast_path_in_background(user_prompt)
+        return user_response
+
+    # 2-5. Build the prompt, call the LLM and validate its JSON. If another
+    # session saved the KB meanwhile, redo it once against the new KB rather
+    # than overwriting that change.
+    for attempt in range(2):
+        result = ask_llm(user_prompt, current_kb)
+        if result is None:
+            return "Sorry, I couldn't process that inventory request."
+
+        updated_kb = canonicalize_kb(result.kb)
+        user_response = result.response
+        llm_needs_confirmation = result.needs_confirmation
+
+        # 6. Check if confirmation is needed
+        if llm_needs_confirmation:
+            return f"{user_response} (Confirmation needed)"
+
+        # 7. Write new KB with backup, only if nobody changed it since step 1
+        try:
+            write_kb_with_backup(ensure_kb_header(updated_kb), expected_version=version)
+            break
+        except InventoryConflict:
+            logger.warning("KB changed during the LLM call (attempt %d), retrying", attempt + 1)
+            stored_kb, version = read_kb_versioned()
+            current_kb = canonicalize_kb(stored_kb)
+    else:
+        return "Sorry, the inventory was being updated at the same time. Please say that again."
 
-    # 8. Return result immediately (don't wait for KB write)
-    return user_response
\ No newline at end of file
+    # 8. Record stock movements in a background thread (non-blocking)
+    record_change_in_background(current_kb, updated_kb)
+    return user_response
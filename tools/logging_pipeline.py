@@ -0,0 +1,133 @@
+"""
+Logging pipeline for the voice agent.
+
+configure_logging() (called once from agent.py) puts a QueueHandler on the
+root logger and does all formatting, redaction and I/O in a QueueListener
+thread, so a log call inside a voice turn is just a queue put.
+
+Large payloads (LLM prompts embed the whole KB) go through log_payload(),
+which samples them (LOG_PAYLOAD_SAMPLE_RATE) and caps their size
+(LOG_PAYLOAD_MAX_CHARS). Callers draw sample_payloads() once per LLM call and
+pass it to both the prompt and the response, so they are logged as a pair.
+Truncation happens lazily in the listener thread.
+Phone numbers, emails, UPI IDs and long account/card numbers are redacted
+from every formatted record, tracebacks included, before it is written.
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import re
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, TextIO
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s - %(message)s"
+
+PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "500"))
+PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))
+
+REDACTIONS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+"), "<email>"),
+    (re.compile(r"\b[\w.-]{2,}@(?:ok)?[a-z]{2,}\b", re.IGNORECASE), "<upi>"),
+    (re.compile(r"(?<!\d)(?:\+?91[ -]?)?[6-9]\d{4}[ -]?\d{5}(?!\d)"), "<phone>"),
+    (re.compile(r"\b\d(?:[ -]?\d){11,18}\b"), "<number>"),
+]
+
+_listener: Optional[QueueListener] = None
+
+
+def redact(text: str) -> str:
+    """Mask customer contact and payment details in a log line."""
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class Payload:
+    """A log argument that is only truncated when the listener formats it."""
+
+    __slots__ = ("text", "limit")
+
+    def __init__(self, text: str, limit: int = PAYLOAD_MAX_CHARS):
+        self.text = text
+        self.limit = limit
+
+    def __str__(self) -> str:
+        if len(self.text) <= self.limit:
+            return self.text
+        return f"{self.text[:self.limit]}... [truncated, {len(self.text)} chars]"
+
+
+def sample_payloads() -> bool:
+    """Whether to log the payloads of one LLM call (LOG_PAYLOAD_SAMPLE_RATE)."""
+    return random.random() < PAYLOAD_SAMPLE_RATE
+
+
+def log_payload(logger: logging.Logger, label: str, text: str, level: int = logging.INFO,
+                sampled: Optional[bool] = None):
+    """Log a large payload (prompt, response, KB), sampled and size-capped.
+
+    Pass the same `sampled` decision for payloads that belong together;
+    without one, this payload is sampled on its own.
+    """
+    if sampled is None:
+        sampled = sample_payloads()
+    if not sampled or not logger.isEnabledFor(level):
+        return
+    logger.log(level, "%s (%d chars): %s", label, len(text), Payload(text))
+
+
+class RedactingFormatter(logging.Formatter):
+    """Redact the fully formatted record, traceback and stack included.
+
+    Redacting in format() rather than in a Filter keeps a record whose message
+    can't be rendered (e.g. too few %-args) inside Handler.emit, where
+    Handler.handleError reports it instead of killing the listener thread.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock QueueHandler formats the record (and any traceback) in the
+    calling thread; this queue never leaves the process, so the record can be
+    passed through as-is.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(level: int = logging.INFO, stream: Optional[TextIO] = None) -> QueueListener:
+    """Route all logging through a background listener. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(RedactingFormatter(LOG_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -5,51 +5,29 @@ import json
 import logging
 import re
 from datetime import datetime
-from pathlib import Path
+from typing import Optional
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from langchain.chat_models import init_chat_model
 from langchain.schema import HumanMessage
 from langchain.tools import tool
 
+from tools.logging_pipeline import log_payload, sample_payloads
+from tools.storage import RemindersConflict, get_storage
+
 # Load environment variables
 load_dotenv()
 os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGCHAIN_API_KEY")
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
-# Configure logging
-logging.basicConfig(
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    level=logging.INFO
-)
+# Logging is configured once by agent.py (tools/logging_pipeline.py)
 logger = logging.getLogger(__name__)
 
 # Initialize LLM
 llm = init_chat_model("gemini-2.0-flash", model_provider="google_genai", temperature=0)
 
-# Reminders file
-REMINDERS_FILE = Path("storage/reminders_kb.txt")
-
-# Ensure storage directory exists
-REMINDERS_FILE.parent.mkdir(exist_ok=True)
-
-if not REMINDERS_FILE.exists():
-    REMINDERS_FILE.write_text("""Last Updated: N/A
-Reminders:
-
-URGENT:
-(Add urgent reminders here)
-
-DAILY:
-(Add daily reminders here)
-
-WEEKLY:
-(Add weekly reminders here)
-
-COMPLETED:
-(Completed reminders will be moved here)
-""")
-    logger.info("Created reminders_kb.txt")
+# Storage backend (text files by default, SQLite with STORAGE_BACKEND=sqlite)
+storage = get_storage()
 
 
 class ReminderLLMResponse(BaseModel):
@@ -60,21 +38,31 @@ class ReminderLLMResponse(BaseModel):
 
 def read_reminders() -> str:
     """Read the entire reminders knowledge base text."""
-    return REMINDERS_FILE.read_text()
+    return storage.read_reminders_kb()
 
 
-def write_reminders(updated_kb: str):
-    """Overwrite the reminders knowledge base with updated text."""
-    REMINDERS_FILE.write_text(updated_kb)
+def read_reminders_versioned():
+    """Read the reminders KB together with the version token write_reminders() checks."""
+    return storage.read_reminders_kb_versioned()
+
+
+def write_reminders(updated_kb: str, expected_version=None):
+    """Overwrite the reminders knowledge base with updated text.
+
+    With `expected_version`, raises RemindersConflict if another session
+    changed the reminders since they were read.
+    """
+    storage.write_reminders_kb(updated_kb, expected_version=expected_version)
     logger.info("Updated reminders KB")
 
 
 def call_llm(prompt: str) -> str:
     """Invoke the LLM and return its text response."""
-    logger.info("LLM prompt: %s", prompt)
+    sampled = sample_payloads()  # log prompt and response together, or neither
+    log_payload(logger, "LLM prompt", prompt, sampled=sampled)
     resp = llm.invoke([HumanMessage(content=prompt)])
     text = resp.content if hasattr(resp, "content") else str(resp)
-    logger.info("LLM response: %s", text)
+    log_payload(logger, "LLM response", text, sampled=sampled)
     return text.strip()
 
 
@@ -124,28 +112,8 @@ def ensure_reminders_header(kb_text: str) -> str:
     return kb
 
 
-# WRAPPER TOOL - Similar to inventory approach
-@tool
-def process_reminders(user_prompt: str) -> str:
-    """
-    Process reminder requests using efficient single-prompt logic.
-    Handles multiple reminder operations in a single LLM call.
-    
-    Examples:
-    - "kal ko yaad dilana"
-    - "reminders dikhao"
-    - "urgent reminders dikhao"
-    - "reminder complete karo"
-    
-    Args:
-        user_prompt: Natural language reminder request
-    
-    Returns:
-        Response from reminder processing
-    """
-    # 1. Read current reminders KB
-    current_kb = read_reminders()
-
+def ask_llm(user_prompt: str, current_kb: str) -> Optional[ReminderLLMResponse]:
+    """Ask the LLM to apply `user_prompt` to the reminders; None if its output is unusable."""
     # 2. Build instruction for LLM
     instruction = f"""
 System:
@@ -208,18 +176,57 @@ Return only the JSON object described above. No explanations.
             result = ReminderLLMResponse(**parsed)
     except Exception as e:
         logger.error("Invalid LLM output: %s", e)
-        return "Sorry, I couldn't process that reminder request."
+        return None
+    return result
 
-    updated_kb = result.kb
-    user_response = result.response
-    llm_needs_confirmation = result.needs_confirmation
 
-    # 6. Check if confirmation is needed
-    if llm_needs_confirmation:
-        return f"{user_response} (Confirmation needed)"
-
-    # 7. Write new KB
-    write_reminders(ensure_reminders_header(updated_kb))
+# WRAPPER TOOL - Similar to inventory approach
+@tool
+def process_reminders(user_prompt: str) -> str:
+    """
+    Process reminder requests using efficient single-prompt logic.
+    Handles multiple reminder operations in a single LLM call.
+    
+    Examples:
+    - "kal ko yaad dilana"
+    - "reminders dikhao"
+    - "urgent reminders dikhao"
+    - "reminder complete karo"
+    
+    Args:
+        user_prompt: Natural language reminder request
+    
+    Returns:
+        Response from reminder processing
+    """
+    # 1. Read current reminders KB and its version
+    current_kb, version = read_reminders_versioned()
+
+    # 2-5. Build the prompt, call the LLM and validate its JSON. If another
+    # session saved reminders meanwhile, redo it once against the new KB
+    # rather than overwriting that change.
+    for attempt in range(2):
+        result = ask_llm(user_prompt, current_kb)
+        if result is None:
+            return "Sorry, I couldn't process that reminder request."
+
+        updated_kb = result.kb
+        user_response = result.response
+        llm_needs_confirmation = result.needs_confirmation
+
+        # 6. Check if confirmation is needed
+        if llm_needs_confirmation:
+            return f"{user_response} (Confirmation needed)"
+
+        # 7. Write new KB, only if nobody changed it since step 1
+        try:
+            write_reminders(ensure_reminders_header(updated_kb), expected_version=version)
+            break
+        except RemindersConflict:
+            logger.warning("Reminders changed during the LLM call (attempt %d), retrying", attempt + 1)
+            current_kb, version = read_reminders_versioned()
+    else:
+        return "Sorry, the reminders were being updated at the same time. Please say that again."
 
     # 8. Return result
-    return user_response
\ No newline at end of file
+    return user_response
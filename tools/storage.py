@@ -0,0 +1,917 @@
+"""
+Pluggable storage backends for inventory, reminders, bills and the sales
+rollups behind tools/analytics_tool.py.
+
+Two backends share the same interface:
+
+- TextFileStorage: the original storage/*.txt files (default, and the
+  import/export format for everything else)
+- SQLiteStorage: a single SQLite database in WAL mode, safe to share between
+  the job processes LiveKit spawns for one worker
+
+Select the backend with STORAGE_BACKEND=text|sqlite. The SQLite backend keeps
+one connection per process (and per thread, since the inventory tool writes
+from a background thread) and imports the existing text files the first time
+the SHOP_TENANT tenant is seen.
+
+Each LiveKit job runs in its own process, so agent.py calls set_tenant() with
+the shop from the job's dispatch metadata before the session starts.
+
+CLI:
+    python -m tools.storage import   # storage/*.txt -> SQLite
+    python -m tools.storage export   # SQLite -> storage/*.txt
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from tools.units import UNIT_PATTERN
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORAGE_DIR = Path("storage")
+INVENTORY_FILE = STORAGE_DIR / "inventory_kb.txt"
+PREV_INVENTORY_FILE = STORAGE_DIR / "inventory_kb_prev.txt"
+REMINDERS_FILE = STORAGE_DIR / "reminders_kb.txt"
+BILLS_FILE = STORAGE_DIR / "bills_kb.txt"
+MOVEMENTS_FILE = STORAGE_DIR / "movements.jsonl"
+ROLLUPS_FILE = STORAGE_DIR / "rollups.json"
+DEFAULT_DB_FILE = STORAGE_DIR / "shop.db"
+DEFAULT_TENANT = "default"
+TENANT_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+DEFAULT_INVENTORY_KB = (
+    "Last Updated: N/A\nItems:\n"
+    "(Add items with format: - quantity item (price: X, other details))\n"
+)
+
+DEFAULT_REMINDERS_KB = """Last Updated: N/A
+Reminders:
+
+URGENT:
+(Add urgent reminders here)
+
+DAILY:
+(Add daily reminders here)
+
+WEEKLY:
+(Add weekly reminders here)
+
+COMPLETED:
+(Completed reminders will be moved here)
+"""
+
+DEFAULT_BILLS_KB = "Last Updated: N/A\nBills:\n"
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Text backend only: rollups.json is rewritten on every change, so day buckets
+# older than this are dropped (the longest day-based report is "month"; week
+# buckets are kept). movements.jsonl is rotated to movements.jsonl.1 once it
+# grows past MOVEMENTS_MAX_BYTES.
+ROLLUP_DAY_RETENTION_DAYS = int(os.getenv("ROLLUP_DAY_RETENTION_DAYS", "92"))
+MOVEMENTS_MAX_BYTES = int(os.getenv("MOVEMENTS_MAX_BYTES", str(8 * 1024 * 1024)))
+
+
+# ---------------------------------------------------------------------------
+# Text format parsing / rendering (shared by both backends)
+# ---------------------------------------------------------------------------
+
+# Only known unit words are units: "- 3 toor dal" is 3 of "toor dal"
+ITEM_LINE_RE = re.compile(
+    rf"^-\s*(?P<qty>\d+(?:\.\d+)?)(?:\s*(?P<unit>{UNIT_PATTERN}))?\s+(?P<item>[^(]+?)\s*"
+    r"(?:\((?P<details>.*)\))?\s*$",
+    re.IGNORECASE,
+)
+CATEGORY_LINE_RE = re.compile(r"^(?P<category>[A-Z][A-Z ]*):\s*$")
+DUE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})(?:[ T](\d{2}:\d{2}))?")
+BILL_LINE_RE = re.compile(
+    r"^-\s*\[(?P<created_at>[^\]]+)\]\s*(?P<customer>[^:]+?):\s*(?P<items>.*?)"
+    r"(?:\s*\(total:\s*(?P<total>\d+(?:\.\d+)?)\))?\s*$"
+)
+
+
+def _split_header(kb_text: str, section: str) -> Tuple[str, List[str]]:
+    """Split a KB into its 'Last Updated' label and the lines after '<section>:'."""
+    label = "N/A"
+    body: List[str] = []
+    in_body = False
+    for line in kb_text.splitlines():
+        stripped = line.strip()
+        if not in_body:
+            if stripped.lower().startswith("last updated:"):
+                label = stripped.split(":", 1)[1].strip() or "N/A"
+                continue
+            if stripped.lower() == f"{section.lower()}:":
+                in_body = True
+                continue
+            # Content before the section header still belongs to the body
+            if stripped:
+                body.append(line.rstrip())
+            continue
+        body.append(line.rstrip())
+    return label, body
+
+
+def parse_inventory_line(line: str) -> Tuple[str, Optional[float], Optional[str], Optional[str]]:
+    """Parse '- 18 kg potato (price: 12)' into (item, quantity, unit, details)."""
+    match = ITEM_LINE_RE.match(line.strip())
+    if not match:
+        return "", None, None, None
+    item = match.group("item").strip().lower()
+    unit = match.group("unit")
+    return item, float(match.group("qty")), unit.lower() if unit else None, match.group("details")
+
+
+def parse_inventory_kb(kb_text: str) -> Tuple[str, List[Tuple[str, Optional[float], Optional[str], Optional[str], str]]]:
+    """Return (label, rows) where each row is (item, quantity, unit, details, line)."""
+    label, body = _split_header(kb_text, "Items")
+    rows = []
+    for line in body:
+        if not line.strip():
+            continue
+        item, quantity, unit, details = parse_inventory_line(line)
+        rows.append((item, quantity, unit, details, line))
+    return label, rows
+
+
+def render_inventory_kb(label: str, lines: Iterable[str]) -> str:
+    return "\n".join([f"Last Updated: {label}", "Items:", *lines])
+
+
+def parse_due_at(text: str) -> Optional[str]:
+    """Extract the first ISO date (optionally with HH:MM) from a reminder as an ISO timestamp."""
+    match = DUE_RE.search(text)
+    if not match:
+        return None
+    day, hhmm = match.groups()
+    return f"{day}T{hhmm or '00:00'}:00"
+
+
+def parse_reminders_kb(kb_text: str) -> Tuple[str, List[Tuple[str, str, Optional[str]]]]:
+    """Return (label, rows) where each row is (category, text, due_at)."""
+    label, body = _split_header(kb_text, "Reminders")
+    rows = []
+    category = ""
+    for line in body:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        match = CATEGORY_LINE_RE.match(stripped)
+        if match:
+            category = match.group("category")
+            # Keep empty categories so the section survives a round trip
+            rows.append((category, "", None))
+            continue
+        rows.append((category, stripped, parse_due_at(stripped)))
+    return label, rows
+
+
+def render_reminders_kb(label: str, rows: Iterable[Tuple[str, str]]) -> str:
+    lines = [f"Last Updated: {label}", "Reminders:"]
+    current = None
+    for category, text in rows:
+        if category != current:
+            current = category
+            if category:
+                lines.extend(["", f"{category}:"])
+        if text:
+            lines.append(text)
+    return "\n".join(lines)
+
+
+def parse_bills_kb(kb_text: str) -> List[Tuple[str, str, str, Optional[float]]]:
+    """Return bills as (created_at, customer, items, total) tuples."""
+    _, body = _split_header(kb_text, "Bills")
+    bills = []
+    for line in body:
+        match = BILL_LINE_RE.match(line.strip())
+        if not match:
+            continue
+        total = match.group("total")
+        bills.append((
+            match.group("created_at").strip(),
+            match.group("customer").strip(),
+            match.group("items").strip(),
+            float(total) if total else None,
+        ))
+    return bills
+
+
+def format_bill_line(created_at: str, customer: str, items: str, total: Optional[float]) -> str:
+    line = f"- [{created_at}] {customer}: {items}"
+    if total is not None:
+        line += f" (total: {total:g})"
+    return line
+
+
+class Movement(NamedTuple):
+    """One stock movement, from an inventory change or a bill line."""
+    ts: datetime
+    item: str
+    unit: str
+    qty_in: float = 0.0
+    qty_out: float = 0.0
+    qty_sold: float = 0.0
+    revenue: float = 0.0
+    source: str = "inventory"
+
+
+# (item, unit, qty_in, qty_out, qty_sold, revenue)
+RollupRow = Tuple[str, str, float, float, float, float]
+
+
+def rollup_buckets(ts: datetime) -> List[Tuple[str, str]]:
+    """Rollup keys a movement at `ts` counts towards: its day and its ISO week."""
+    year, week, _ = ts.isocalendar()
+    return [("day", ts.strftime("%Y-%m-%d")), ("week", f"{year}-W{week:02d}")]
+
+
+class KBConflict(Exception):
+    """A KB changed since the version the caller read."""
+
+
+class InventoryConflict(KBConflict):
+    """The inventory KB changed since the version the caller read."""
+
+
+class RemindersConflict(KBConflict):
+    """The reminders KB changed since the version the caller read."""
+
+
+def check_tenant(tenant: str) -> str:
+    if not TENANT_RE.match(tenant or ""):
+        raise ValueError(f"Invalid tenant: {tenant!r} (letters, digits, '-' and '_' only)")
+    return tenant
+
+
+def _text_version(kb_text: str) -> str:
+    return hashlib.sha1(kb_text.encode()).hexdigest()
+
+
+def _atomic_write(path: Path, text: str):
+    """Write via a temp file + rename so readers in other processes never see a torn file."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+class _FileLock:
+    """Exclusive lock across threads (threading.Lock) and processes (flock on `path`)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self._file = open(self.path, "a")
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._file.close()  # closing the descriptor releases the flock
+        finally:
+            self._file = None
+            self._thread_lock.release()
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class TextFileStorage:
+    """The original plain-text KB files under storage/."""
+
+    name = "text"
+
+    def __init__(self, directory: Path = STORAGE_DIR, tenant: str = DEFAULT_TENANT):
+        # `directory` holds `tenant`'s files; other shops live under directory/tenants/<name>
+        self.base_directory = Path(directory)
+        self.home_tenant = self.tenant = check_tenant(tenant)
+        self._use_directory(self.base_directory)
+
+    def set_tenant(self, tenant: str):
+        self.tenant = check_tenant(tenant)
+        if tenant == self.home_tenant:
+            self._use_directory(self.base_directory)
+        else:
+            self._use_directory(self.base_directory / "tenants" / tenant)
+
+    def _use_directory(self, directory: Path):
+        self.directory = directory
+        self.inventory_file = self.directory / INVENTORY_FILE.name
+        self.prev_inventory_file = self.directory / PREV_INVENTORY_FILE.name
+        self.reminders_file = self.directory / REMINDERS_FILE.name
+        self.bills_file = self.directory / BILLS_FILE.name
+        self.movements_file = self.directory / MOVEMENTS_FILE.name
+        self.rollups_file = self.directory / ROLLUPS_FILE.name
+        self._inventory_lock = _FileLock(self.directory / ".inventory_kb.lock")
+        self._reminders_lock = _FileLock(self.directory / ".reminders_kb.lock")
+        self._bills_lock = _FileLock(self.directory / ".bills_kb.lock")
+        self._rollups_lock = _FileLock(self.directory / ".rollups.lock")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path, default in (
+            (self.inventory_file, DEFAULT_INVENTORY_KB),
+            (self.reminders_file, DEFAULT_REMINDERS_KB),
+        ):
+            if not path.exists():
+                path.write_text(default)
+                logger.info("Created %s", path.name)
+
+    def read_inventory_kb(self) -> str:
+        return self.inventory_file.read_text()
+
+    def read_inventory_backup(self) -> Optional[str]:
+        """The KB as it was before the last write with backup=True."""
+        if not self.prev_inventory_file.exists():
+            return None
+        return self.prev_inventory_file.read_text()
+
+    def read_inventory_kb_versioned(self) -> Tuple[str, str]:
+        """The KB and a version token to pass back as write_inventory_kb(expected_version=...)."""
+        kb_text = self.read_inventory_kb()
+        return kb_text, _text_version(kb_text)
+
+    def write_inventory_kb(self, kb_text: str, backup: bool = False,
+                           expected_version: Optional[str] = None):
+        """Replace the KB; raises InventoryConflict if it no longer matches `expected_version`."""
+        with self._inventory_lock:
+            previous = self.read_inventory_kb()
+            if expected_version is not None and _text_version(previous) != expected_version:
+                raise InventoryConflict("inventory KB changed since it was read")
+            self._replace_inventory(previous, kb_text, backup)
+
+    def update_inventory_kb(self, update: Callable[[str], Optional[str]],
+                            backup: bool = True) -> Tuple[str, Optional[str]]:
+        """Apply `update` to the current KB under the inventory lock.
+
+        `update` returns the new KB text, or None to leave it unchanged.
+        Returns (previous KB, new KB or None).
+        """
+        with self._inventory_lock:
+            previous = self.read_inventory_kb()
+            kb_text = update(previous)
+            if kb_text is not None:
+                self._replace_inventory(previous, kb_text, backup)
+            return previous, kb_text
+
+    def _replace_inventory(self, previous: str, kb_text: str, backup: bool):
+        if backup:
+            try:
+                _atomic_write(self.prev_inventory_file, previous)
+            except Exception as e:
+                logger.warning("Failed to write previous KB backup: %s", e)
+        _atomic_write(self.inventory_file, kb_text)
+
+    def read_reminders_kb(self) -> str:
+        return self.reminders_file.read_text()
+
+    def read_reminders_kb_versioned(self) -> Tuple[str, str]:
+        """The reminders KB and a version token for write_reminders_kb(expected_version=...)."""
+        kb_text = self.read_reminders_kb()
+        return kb_text, _text_version(kb_text)
+
+    def write_reminders_kb(self, kb_text: str, expected_version: Optional[str] = None):
+        """Replace the reminders; raises RemindersConflict if they no longer match `expected_version`."""
+        with self._reminders_lock:
+            if expected_version is not None and _text_version(self.read_reminders_kb()) != expected_version:
+                raise RemindersConflict("reminders KB changed since it was read")
+            _atomic_write(self.reminders_file, kb_text)
+
+    def add_bill(self, customer: str, items: str, total: Optional[float] = None) -> None:
+        created_at = datetime.now().strftime(TIMESTAMP_FORMAT)
+        line = format_bill_line(created_at, customer, items, total) + "\n"
+        # Inter-process lock: otherwise two processes adding the first bill can both
+        # write the header, and the second replaces the file holding the first bill
+        with self._bills_lock:
+            if not self.bills_file.exists():
+                _atomic_write(self.bills_file, DEFAULT_BILLS_KB)
+            with open(self.bills_file, "a") as f:
+                f.write(line)
+
+    def list_bills(self) -> List[Tuple[str, str, str, Optional[float]]]:
+        if not self.bills_file.exists():
+            return []
+        return parse_bills_kb(self.bills_file.read_text())
+
+    def _load_rollups(self) -> Dict[str, Dict[str, Dict[str, List[float]]]]:
+        # {period: {bucket: {"item|unit": [qty_in, qty_out, qty_sold, revenue]}}}
+        # Always read from disk: other job processes update the same file.
+        if self.rollups_file.exists():
+            return json.loads(self.rollups_file.read_text())
+        return {"day": {}, "week": {}}
+
+    def record_movements(self, movements: Iterable[Movement]):
+        """Append raw movements and fold them into the rollups file under an inter-process lock.
+
+        Each call reads and rewrites the whole rollups file, so its cost grows
+        with the retained buckets: day buckets older than
+        ROLLUP_DAY_RETENTION_DAYS are pruned, week buckets (one per item per
+        week) are kept. Busy shops should use the SQLite backend.
+        """
+        movements = list(movements)
+        if not movements:
+            return
+        with self._rollups_lock:
+            rollups = self._load_rollups()
+            if self.movements_file.exists() and self.movements_file.stat().st_size > MOVEMENTS_MAX_BYTES:
+                # Raw movements are only an audit trail; the rollups hold the totals
+                os.replace(self.movements_file, self.directory / f"{MOVEMENTS_FILE.name}.1")
+            with open(self.movements_file, "a") as f:
+                f.write("".join(
+                    json.dumps({**m._asdict(), "ts": m.ts.strftime(TIMESTAMP_FORMAT)}) + "\n"
+                    for m in movements
+                ))
+            for m in movements:
+                for period, bucket in rollup_buckets(m.ts):
+                    totals = rollups[period].setdefault(bucket, {}).setdefault(
+                        f"{m.item}|{m.unit}", [0.0, 0.0, 0.0, 0.0]
+                    )
+                    totals[0] += m.qty_in
+                    totals[1] += m.qty_out
+                    totals[2] += m.qty_sold
+                    totals[3] += m.revenue
+            cutoff = (date.today() - timedelta(days=ROLLUP_DAY_RETENTION_DAYS)).isoformat()
+            rollups["day"] = {bucket: items for bucket, items in rollups["day"].items() if bucket >= cutoff}
+            _atomic_write(self.rollups_file, json.dumps(rollups))
+
+    def query_rollups(self, period: str, start: str, end: str,
+                      item: Optional[str] = None) -> List[RollupRow]:
+        # Writers replace the file atomically, so a read needs no lock
+        buckets = self._load_rollups()[period]
+        summed: Dict[Tuple[str, str], List[float]] = {}
+        for bucket, items in buckets.items():
+            if not start <= bucket <= end:
+                continue
+            for key, totals in items.items():
+                name, unit = key.split("|", 1)
+                if item is not None and name != item:
+                    continue
+                acc = summed.setdefault((name, unit), [0.0, 0.0, 0.0, 0.0])
+                for i, value in enumerate(totals):
+                    acc[i] += value
+        rows = [(name, unit, *totals) for (name, unit), totals in summed.items()]
+        return sorted(rows, key=lambda r: (-r[4], -r[5], r[0]))
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kb_meta (
+    tenant TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    label TEXT NOT NULL,
+    previous TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant, kind)
+);
+CREATE TABLE IF NOT EXISTS inventory_items (
+    tenant TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    quantity REAL,
+    unit TEXT,
+    details TEXT,
+    line TEXT NOT NULL,
+    PRIMARY KEY (tenant, position)
+);
+CREATE INDEX IF NOT EXISTS idx_inventory_item ON inventory_items (tenant, item);
+CREATE TABLE IF NOT EXISTS reminders (
+    tenant TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    text TEXT NOT NULL,
+    due_at TEXT,
+    PRIMARY KEY (tenant, position)
+);
+CREATE TABLE IF NOT EXISTS bills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    customer TEXT NOT NULL,
+    items TEXT NOT NULL,
+    total REAL
+);
+CREATE INDEX IF NOT EXISTS idx_bills_created ON bills (tenant, created_at);
+CREATE INDEX IF NOT EXISTS idx_bills_customer ON bills (tenant, customer);
+CREATE TABLE IF NOT EXISTS movements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    item TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    qty_in REAL NOT NULL,
+    qty_out REAL NOT NULL,
+    qty_sold REAL NOT NULL,
+    revenue REAL NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_movements_item ON movements (tenant, item, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    tenant TEXT NOT NULL,
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    item TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    qty_in REAL NOT NULL,
+    qty_out REAL NOT NULL,
+    qty_sold REAL NOT NULL,
+    revenue REAL NOT NULL,
+    PRIMARY KEY (tenant, period, bucket, item, unit)
+);
+"""
+
+# Statements are module constants with bound parameters so sqlite3's per-connection
+# statement cache compiles each one once per process.
+SQL_SELECT_META = "SELECT label, version FROM kb_meta WHERE tenant = ? AND kind = ?"
+SQL_SELECT_PREVIOUS = "SELECT previous FROM kb_meta WHERE tenant = ? AND kind = ?"
+SQL_UPSERT_META = (
+    "INSERT INTO kb_meta (tenant, kind, label, previous, version) VALUES (?, ?, ?, ?, 1) "
+    "ON CONFLICT (tenant, kind) DO UPDATE SET label = excluded.label, "
+    "previous = COALESCE(excluded.previous, kb_meta.previous), version = kb_meta.version + 1"
+)
+SQL_SELECT_ITEMS = "SELECT line FROM inventory_items WHERE tenant = ? ORDER BY position"
+SQL_DELETE_ITEMS = "DELETE FROM inventory_items WHERE tenant = ?"
+SQL_INSERT_ITEM = (
+    "INSERT INTO inventory_items (tenant, position, item, quantity, unit, details, line) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_SELECT_REMINDERS = "SELECT category, text FROM reminders WHERE tenant = ? ORDER BY position"
+SQL_DELETE_REMINDERS = "DELETE FROM reminders WHERE tenant = ?"
+SQL_INSERT_REMINDER = (
+    "INSERT INTO reminders (tenant, position, category, text, due_at) VALUES (?, ?, ?, ?, ?)"
+)
+SQL_INSERT_BILL = (
+    "INSERT INTO bills (tenant, created_at, customer, items, total) VALUES (?, ?, ?, ?, ?)"
+)
+SQL_SELECT_BILLS = (
+    "SELECT created_at, customer, items, total FROM bills WHERE tenant = ? ORDER BY id"
+)
+SQL_INSERT_MOVEMENT = (
+    "INSERT INTO movements (tenant, ts, item, unit, qty_in, qty_out, qty_sold, revenue, source) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_UPSERT_ROLLUP = (
+    "INSERT INTO rollups (tenant, period, bucket, item, unit, qty_in, qty_out, qty_sold, revenue) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (tenant, period, bucket, item, unit) DO UPDATE SET "
+    "qty_in = qty_in + excluded.qty_in, qty_out = qty_out + excluded.qty_out, "
+    "qty_sold = qty_sold + excluded.qty_sold, revenue = revenue + excluded.revenue"
+)
+SQL_SELECT_ROLLUPS = (
+    "SELECT item, unit, SUM(qty_in), SUM(qty_out), SUM(qty_sold), SUM(revenue) FROM rollups "
+    "WHERE tenant = ? AND period = ? AND bucket BETWEEN ? AND ? GROUP BY item, unit "
+    "ORDER BY SUM(qty_sold) DESC, SUM(revenue) DESC, item"
+)
+SQL_SELECT_ITEM_ROLLUPS = (
+    "SELECT item, unit, SUM(qty_in), SUM(qty_out), SUM(qty_sold), SUM(revenue) FROM rollups "
+    "WHERE tenant = ? AND period = ? AND bucket BETWEEN ? AND ? AND item = ? GROUP BY item, unit "
+    "ORDER BY SUM(qty_sold) DESC, SUM(revenue) DESC"
+)
+
+
+class SQLiteStorage:
+    """SQLite (WAL) backend shared by all job processes of a worker."""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Path = DEFAULT_DB_FILE, tenant: str = DEFAULT_TENANT,
+                 import_from: Optional[TextFileStorage] = None):
+        self.db_path = Path(db_path)
+        # The text files in `import_from` belong to the tenant the backend was created for
+        self.home_tenant = self.tenant = check_tenant(tenant)
+        self._import_from = import_from
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # -- connection management ------------------------------------------------
+
+    def _conn(self) -> sqlite3.Connection:
+        """Connection for the current process/thread; reopened after fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            isolation_level=None,  # explicit BEGIN IMMEDIATE below
+            cached_statements=64,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._maybe_import(conn)
+        return conn
+
+    def set_tenant(self, tenant: str):
+        self.tenant = check_tenant(tenant)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            # Connected as another tenant, so the home tenant wasn't seeded yet
+            self._maybe_import(conn)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Add columns introduced after a database was created."""
+        if "version" in {row[1] for row in conn.execute("PRAGMA table_info(kb_meta)")}:
+            return
+        with _Transaction(conn):
+            if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(kb_meta)")}:
+                conn.execute("ALTER TABLE kb_meta ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def _maybe_import(self, conn: sqlite3.Connection):
+        """Seed an empty tenant from the text files (one process wins, the rest see the rows)."""
+        if self._import_from is None or self.tenant != self.home_tenant:
+            return
+        if conn.execute(SQL_SELECT_META, (self.tenant, "inventory")).fetchone():
+            return
+        with _Transaction(conn):
+            if conn.execute(SQL_SELECT_META, (self.tenant, "inventory")).fetchone():
+                return
+            logger.info("Importing text KB files into %s (tenant=%s)", self.db_path, self.tenant)
+            self._replace_inventory(
+                conn, self._import_from.read_inventory_kb(), self._import_from.read_inventory_backup()
+            )
+            self._replace_reminders(conn, self._import_from.read_reminders_kb())
+            conn.executemany(
+                SQL_INSERT_BILL,
+                [(self.tenant, *bill) for bill in self._import_from.list_bills()],
+            )
+
+    # -- inventory --------------------------------------------------------------
+
+    def read_inventory_kb(self) -> str:
+        return self.read_inventory_kb_versioned()[0]
+
+    def read_inventory_backup(self) -> Optional[str]:
+        """The KB as it was before the last write with backup=True (kb_meta.previous)."""
+        row = self._conn().execute(SQL_SELECT_PREVIOUS, (self.tenant, "inventory")).fetchone()
+        return row[0] if row else None
+
+    def read_inventory_kb_versioned(self) -> Tuple[str, int]:
+        """The KB and a version token to pass back as write_inventory_kb(expected_version=...)."""
+        conn = self._conn()
+        with _Transaction(conn, "DEFERRED"):  # one snapshot for meta + items
+            return self._read_inventory(conn)
+
+    def _read_inventory(self, conn: sqlite3.Connection) -> Tuple[str, int]:
+        meta = conn.execute(SQL_SELECT_META, (self.tenant, "inventory")).fetchone()
+        if meta is None:
+            return DEFAULT_INVENTORY_KB, 0
+        lines = [row[0] for row in conn.execute(SQL_SELECT_ITEMS, (self.tenant,))]
+        return render_inventory_kb(meta[0], lines), meta[1]
+
+    def write_inventory_kb(self, kb_text: str, backup: bool = False,
+                           expected_version: Optional[int] = None):
+        """Replace the KB; raises InventoryConflict if it no longer matches `expected_version`."""
+        conn = self._conn()
+        with _Transaction(conn):
+            previous, version = self._read_inventory(conn)
+            if expected_version is not None and version != expected_version:
+                raise InventoryConflict("inventory KB changed since it was read")
+            self._replace_inventory(conn, kb_text, previous if backup else None)
+
+    def update_inventory_kb(self, update: Callable[[str], Optional[str]],
+                            backup: bool = True) -> Tuple[str, Optional[str]]:
+        """Apply `update` to the current KB inside one write transaction.
+
+        `update` returns the new KB text, or None to leave it unchanged.
+        Returns (previous KB, new KB or None).
+        """
+        conn = self._conn()
+        with _Transaction(conn):
+            previous, _ = self._read_inventory(conn)
+            kb_text = update(previous)
+            if kb_text is not None:
+                self._replace_inventory(conn, kb_text, previous if backup else None)
+            return previous, kb_text
+
+    def _replace_inventory(self, conn: sqlite3.Connection, kb_text: str, previous: Optional[str] = None):
+        label, rows = parse_inventory_kb(kb_text)
+        conn.execute(SQL_UPSERT_META, (self.tenant, "inventory", label, previous))
+        conn.execute(SQL_DELETE_ITEMS, (self.tenant,))
+        conn.executemany(
+            SQL_INSERT_ITEM,
+            [(self.tenant, pos, *row) for pos, row in enumerate(rows)],
+        )
+
+    # -- reminders --------------------------------------------------------------
+
+    def read_reminders_kb(self) -> str:
+        return self.read_reminders_kb_versioned()[0]
+
+    def read_reminders_kb_versioned(self) -> Tuple[str, int]:
+        """The reminders KB and a version token for write_reminders_kb(expected_version=...)."""
+        conn = self._conn()
+        with _Transaction(conn, "DEFERRED"):
+            return self._read_reminders(conn)
+
+    def _read_reminders(self, conn: sqlite3.Connection) -> Tuple[str, int]:
+        meta = conn.execute(SQL_SELECT_META, (self.tenant, "reminders")).fetchone()
+        if meta is None:
+            return DEFAULT_REMINDERS_KB, 0
+        return render_reminders_kb(meta[0], conn.execute(SQL_SELECT_REMINDERS, (self.tenant,))), meta[1]
+
+    def write_reminders_kb(self, kb_text: str, expected_version: Optional[int] = None):
+        """Replace the reminders; raises RemindersConflict if they no longer match `expected_version`."""
+        conn = self._conn()
+        with _Transaction(conn):
+            if expected_version is not None and self._read_reminders(conn)[1] != expected_version:
+                raise RemindersConflict("reminders KB changed since it was read")
+            self._replace_reminders(conn, kb_text)
+
+    def _replace_reminders(self, conn: sqlite3.Connection, kb_text: str):
+        label, rows = parse_reminders_kb(kb_text)
+        conn.execute(SQL_UPSERT_META, (self.tenant, "reminders", label, None))
+        conn.execute(SQL_DELETE_REMINDERS, (self.tenant,))
+        conn.executemany(
+            SQL_INSERT_REMINDER,
+            [(self.tenant, pos, *row) for pos, row in enumerate(rows)],
+        )
+
+    # -- bills ------------------------------------------------------------------
+
+    def add_bill(self, customer: str, items: str, total: Optional[float] = None) -> int:
+        created_at = datetime.now().strftime(TIMESTAMP_FORMAT)
+        conn = self._conn()
+        with _Transaction(conn):
+            cur = conn.execute(SQL_INSERT_BILL, (self.tenant, created_at, customer, items, total))
+        return cur.lastrowid
+
+    def list_bills(self) -> List[Tuple[str, str, str, Optional[float]]]:
+        return self._conn().execute(SQL_SELECT_BILLS, (self.tenant,)).fetchall()
+
+    # -- movements / rollups --------------------------------------------------------
+
+    def record_movements(self, movements: Iterable[Movement]):
+        """Append raw movements and fold them into the day/week rollups in one transaction."""
+        movement_rows = []
+        rollup_rows = []
+        for m in movements:
+            movement_rows.append((
+                self.tenant, m.ts.strftime(TIMESTAMP_FORMAT), m.item, m.unit,
+                m.qty_in, m.qty_out, m.qty_sold, m.revenue, m.source,
+            ))
+            for period, bucket in rollup_buckets(m.ts):
+                rollup_rows.append((
+                    self.tenant, period, bucket, m.item, m.unit,
+                    m.qty_in, m.qty_out, m.qty_sold, m.revenue,
+                ))
+        if not movement_rows:
+            return
+        conn = self._conn()
+        with _Transaction(conn):
+            conn.executemany(SQL_INSERT_MOVEMENT, movement_rows)
+            conn.executemany(SQL_UPSERT_ROLLUP, rollup_rows)
+
+    def query_rollups(self, period: str, start: str, end: str,
+                      item: Optional[str] = None) -> List[RollupRow]:
+        """Summed rollups for buckets in [start, end]; reads only the rollup table."""
+        if item is None:
+            return self._conn().execute(
+                SQL_SELECT_ROLLUPS, (self.tenant, period, start, end)
+            ).fetchall()
+        return self._conn().execute(
+            SQL_SELECT_ITEM_ROLLUPS, (self.tenant, period, start, end, item)
+        ).fetchall()
+
+    # -- import / export ----------------------------------------------------------
+
+    def import_text(self, source: TextFileStorage):
+        """Replace this tenant's data with the contents of the text files."""
+        conn = self._conn()
+        with _Transaction(conn):
+            # inventory_kb_prev.txt becomes the backup; without one, back up what's being replaced
+            previous = source.read_inventory_backup() or self._read_inventory(conn)[0]
+            self._replace_inventory(conn, source.read_inventory_kb(), previous)
+            self._replace_reminders(conn, source.read_reminders_kb())
+            conn.execute("DELETE FROM bills WHERE tenant = ?", (self.tenant,))
+            conn.executemany(
+                SQL_INSERT_BILL,
+                [(self.tenant, *bill) for bill in source.list_bills()],
+            )
+
+    def export_text(self, target: TextFileStorage):
+        """Write this tenant's data out as the plain-text KB files."""
+        target.write_inventory_kb(self.read_inventory_kb())
+        previous = self.read_inventory_backup()
+        if previous is not None:
+            _atomic_write(target.prev_inventory_file, previous)
+        target.write_reminders_kb(self.read_reminders_kb())
+        bills = [format_bill_line(*bill) for bill in self.list_bills()]
+        now = datetime.now().strftime(TIMESTAMP_FORMAT)
+        _atomic_write(target.bills_file, "\n".join([f"Last Updated: {now}", "Bills:", *bills]) + "\n")
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE (or DEFERRED for read snapshots) ... COMMIT/ROLLBACK on an autocommit connection."""
+
+    def __init__(self, conn: sqlite3.Connection, mode: str = "IMMEDIATE"):
+        self.conn = conn
+        self.mode = mode
+
+    def __enter__(self):
+        self.conn.execute(f"BEGIN {self.mode}")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Backend selection
+# ---------------------------------------------------------------------------
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(backend: Optional[str] = None):
+    """Build a backend from STORAGE_BACKEND / STORAGE_DB / SHOP_TENANT."""
+    backend = (backend or os.getenv("STORAGE_BACKEND", "text")).lower()
+    text = TextFileStorage(tenant=os.getenv("SHOP_TENANT", DEFAULT_TENANT))
+    if backend == "text":
+        return text
+    if backend == "sqlite":
+        return SQLiteStorage(
+            db_path=Path(os.getenv("STORAGE_DB", str(DEFAULT_DB_FILE))),
+            tenant=text.home_tenant,
+            import_from=text,
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r} (expected 'text' or 'sqlite')")
+
+
+def get_storage():
+    """Process-wide storage backend, created on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+                logger.info("Using %s storage backend", _storage.name)
+    return _storage
+
+
+def set_tenant(tenant: str):
+    """Point this process's storage backend at `tenant` (LiveKit runs one job per process)."""
+    storage = get_storage()
+    if tenant != storage.tenant:
+        storage.set_tenant(tenant)
+        logger.info("Using tenant %s", tenant)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move KB data between text files and SQLite")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--db", default=os.getenv("STORAGE_DB", str(DEFAULT_DB_FILE)))
+    parser.add_argument("--tenant", default=os.getenv("SHOP_TENANT", DEFAULT_TENANT))
+    parser.add_argument("--dir", default=str(STORAGE_DIR), help="Directory holding the .txt files")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    text = TextFileStorage(Path(args.dir))
+    db = SQLiteStorage(Path(args.db), tenant=args.tenant)
+    if args.command == "import":
+        db.import_text(text)
+        logger.info("Imported %s into %s", args.dir, args.db)
+    else:
+        db.export_text(text)
+        logger.info("Exported %s to %s", args.db, args.dir)
+
+
+if __name__ == "__main__":
+    main()
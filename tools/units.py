@@ -0,0 +1,64 @@
+# units.py
+"""
+Units of measure shared by the KB parser (tools/storage.py) and the item
+catalog (tools/catalog.py).
+
+Only words listed in UNIT_ALIASES are treated as units, so "- 3 toor dal" is
+3 of "toor dal" and not 3 "toor" of "dal".
+"""
+import re
+from typing import NamedTuple, Optional
+
+
+class Unit(NamedTuple):
+    name: str
+    base: str
+    factor: float  # multiply by this to get `base` units
+
+
+UNITS = {
+    "kg": Unit("kg", "kg", 1.0),
+    "g": Unit("g", "kg", 0.001),
+    "pao": Unit("pao", "kg", 0.25),  # a quarter kilo: "1 pao aloo"
+    "litre": Unit("litre", "litre", 1.0),
+    "ml": Unit("ml", "litre", 0.001),
+    "pc": Unit("pc", "pc", 1.0),
+    "dozen": Unit("dozen", "pc", 12.0),
+    "packet": Unit("packet", "packet", 1.0),
+}
+
+UNIT_ALIASES = {
+    "kg": "kg", "kgs": "kg", "kilo": "kg", "kilos": "kg", "kilogram": "kg", "kilograms": "kg",
+    "g": "g", "gm": "g", "gms": "g", "gram": "g", "grams": "g", "gramme": "g",
+    "pao": "pao", "pav": "pao", "paav": "pao", "paw": "pao",
+    "l": "litre", "ltr": "litre", "ltrs": "litre", "litre": "litre", "litres": "litre",
+    "liter": "litre", "liters": "litre",
+    "ml": "ml", "millilitre": "ml", "milliliter": "ml",
+    "pc": "pc", "pcs": "pc", "piece": "pc", "pieces": "pc", "nag": "pc",
+    "dozen": "dozen", "dozens": "dozen", "darjan": "dozen", "darzan": "dozen",
+    "packet": "packet", "packets": "packet", "pkt": "packet", "pkts": "packet",
+    "pack": "packet", "packs": "packet", "paket": "packet",
+}
+
+# Regex alternation of every unit alias, longest first ("kgs" before "kg"),
+# followed by a word boundary so "l" doesn't match the start of "lemons".
+# Compile with re.IGNORECASE.
+UNIT_PATTERN = "(?:{})(?![^\\W\\d_])".format(
+    "|".join(re.escape(alias) for alias in sorted(UNIT_ALIASES, key=len, reverse=True))
+)
+
+
+def canonical_unit(unit: Optional[str]) -> str:
+    """'KG', 'kilo' -> 'kg'; unknown units are lower-cased as-is; None -> ''."""
+    if not unit:
+        return ""
+    unit = unit.lower()
+    return UNIT_ALIASES.get(unit, unit)
+
+
+def convert(quantity: float, from_unit: str, to_unit: str) -> Optional[float]:
+    """Convert between canonical units of the same kind; None if they don't convert."""
+    src, dst = UNITS.get(from_unit), UNITS.get(to_unit)
+    if src is None or dst is None or src.base != dst.base:
+        return None
+    return quantity * src.factor / dst.factor